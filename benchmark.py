@@ -0,0 +1,113 @@
+"""
+Offline download benchmark.
+
+Runs a synthetic playlist from the fake extractor backend through the real
+download pipeline in a throwaway directory, and reports ingest throughput,
+database writes and progress (UI) updates:
+
+    python benchmark.py --tracks 50 --size-kb 4000 --latency 0.05 --bandwidth-kbps 2000 --runs 3
+"""
+import argparse, os, sys, tempfile, time
+
+class CountingControl:
+    """Stands in for a flet control and counts how often it is pushed to the client."""
+    __slots__ = ['value', 'updates']
+    def __init__(self):
+        self.value = None
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark playlist ingest against the offline fake backend.")
+    parser.add_argument("--tracks", type=int, default=30)
+    parser.add_argument("--size-kb", type=int, default=2000, help="size of every synthetic track")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds before every request answers")
+    parser.add_argument("--bandwidth-kbps", type=int, default=0, help="per-download throttle, 0 = unthrottled")
+    parser.add_argument("--source", help="serve copies of this audio file instead of filler bytes")
+    parser.add_argument("--fetch-workers", type=int, default=3)
+    parser.add_argument("--fps", type=int, default=10, help="progress updates per second")
+    parser.add_argument("--processes", type=int, default=0, help="run through the worker-process client, 0 = in-process")
+    parser.add_argument("--runs", type=int, default=1)
+    return parser.parse_args()
+
+def run_once(args, number):
+    from source.data.db import DbService
+    from source.data.progress import ProgressAggregator
+
+    name = f"bench-{number}"
+    link = f"fake://{name}?tracks={args.tracks}&size={args.size_kb * 1024}&latency={args.latency}&bandwidth={args.bandwidth_kbps * 1024}"
+    if args.source:
+        link += f"&source={os.path.abspath(args.source)}"
+    DbService.add_playlist(name, link)
+
+    text, bar = CountingControl(), CountingControl()
+    progress = ProgressAggregator(text, bar, args.fps).start()
+    writes_before = DbService.write_count
+    started = time.perf_counter()
+    if args.processes > 0:
+        from source.data.downloader import DownloadClient
+        client = DownloadClient(args.processes)
+        client.wait(client.submit(link, name, progress))
+    else:
+        from source.data.youtube import run_playlist_download
+        run_playlist_download(link, name, progress)
+    elapsed = time.perf_counter() - started
+    progress.stop()
+
+    tracks = len(DbService.get_playlist_data(name))
+    megabytes = tracks * args.size_kb / 1024
+    return {
+        "seconds": elapsed,
+        "tracks": tracks,
+        "tracks_per_s": tracks / elapsed if elapsed else 0,
+        "mb_per_s": megabytes / elapsed if elapsed else 0,
+        # writes made inside worker processes are not visible from here
+        "db_writes": None if args.processes > 0 else DbService.write_count - writes_before,
+        "events": progress.events,
+        "ui_updates": text.updates + bar.updates,
+    }
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="ytplayer-bench-")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    # utils resolves data.db and the download folders from the working directory at import time
+    os.chdir(workdir)
+    from source.data.db import DbService
+
+    DbService.init_db()
+    DbService.init_settings()
+    DbService.set_setting("download_mode", "native")
+    DbService.set_setting("fetch_workers", str(args.fetch_workers))
+    DbService.set_setting("progress_fps", str(args.fps))
+    DbService.set_setting("download_processes", str(max(1, args.processes)))
+
+    connect = DbService._connect
+    DbService.write_count = 0
+    def counted(statement):
+        if statement.lstrip().split(" ", 1)[0].upper() in ("INSERT", "UPDATE", "DELETE", "REPLACE"):
+            DbService.write_count += 1
+    def connect_counting():
+        conn = connect()
+        conn.set_trace_callback(counted)
+        return conn
+    DbService._connect = staticmethod(connect_counting)
+
+    print(f"Benchmark directory: {workdir}")
+    results = []
+    for number in range(1, args.runs + 1):
+        result = run_once(args, number)
+        results.append(result)
+        db_writes = "n/a" if result["db_writes"] is None else result["db_writes"]
+        print(f"run {number}: {result['tracks']} tracks in {result['seconds']:.2f}s "
+              f"({result['tracks_per_s']:.1f} tracks/s, {result['mb_per_s']:.1f} MB/s), "
+              f"db writes {db_writes}, progress events {result['events']}, ui updates {result['ui_updates']}")
+    if len(results) > 1:
+        best = min(results, key=lambda r: r["seconds"])
+        mean = sum(r["seconds"] for r in results) / len(results)
+        print(f"best {best['seconds']:.2f}s, mean {mean:.2f}s over {len(results)} runs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import threading, time
+from contextlib import contextmanager
+
+# Tracks whether the UI is doing something latency sensitive (loading a view,
+# seeking) so background jobs can stay out of its way.
+_lock = threading.Lock()
+_busy = {}
+_hold_until = 0.0
+_idle_since = time.monotonic()
+
+def mark_busy(reason):
+    with _lock:
+        _busy[reason] = _busy.get(reason, 0) + 1
+
+def mark_idle(reason):
+    global _idle_since
+    with _lock:
+        count = _busy.get(reason, 0) - 1
+        if count > 0:
+            _busy[reason] = count
+        else:
+            _busy.pop(reason, None)
+        if not _busy:
+            _idle_since = time.monotonic()
+
+@contextmanager
+def busy(reason):
+    mark_busy(reason)
+    try:
+        yield
+    finally:
+        mark_idle(reason)
+
+def hold(seconds):
+    global _hold_until, _idle_since
+    with _lock:
+        _hold_until = max(_hold_until, time.monotonic() + seconds)
+        _idle_since = _hold_until
+
+def is_idle(settle=0.0):
+    now = time.monotonic()
+    with _lock:
+        return not _busy and now >= _hold_until and now - _idle_since >= settle
+
+def wait_until_idle(stop_event, settle=1.0, poll=0.5):
+    while not is_idle(settle):
+        if stop_event.wait(poll):
+            return False
+    return not stop_event.is_set()
+
+# the file the player currently has loaded; jobs that rewrite audio files leave it alone
+_now_playing = None
+# the next track, already loaded on the standby player
+_preloaded = None
+
+def set_now_playing(path):
+    global _now_playing
+    _now_playing = path
+
+def now_playing():
+    return _now_playing
+
+def set_preloaded(path):
+    global _preloaded
+    _preloaded = path
+
+def preloaded():
+    return _preloaded
@@ -0,0 +1,207 @@
+import os, threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from . import activity
+from .db import DbService
+from .media import decode_pcm, lower_process_priority
+from .features import FEATURE_DIM, append_features
+from .peaks import compute_peaks, append_peaks
+
+SAMPLE_RATE = 22050
+BATCH_SIZE = 50
+
+# bits of files.analysed, so each analysis runs once per file
+ANALYSED_LOUDNESS = 1
+ANALYSED_FEATURES = 2
+ANALYSED_PEAKS = 4
+ALL_ANALYSES = ANALYSED_LOUDNESS | ANALYSED_FEATURES | ANALYSED_PEAKS
+
+TARGET_LUFS = -14.0
+MAX_GAIN_DB = 12.0
+SILENCE_DB = -50.0
+MIN_SILENCE = 1.0
+
+def _k_weighting_power(freqs):
+    # squared magnitude of the BS.1770 K-weighting filter (high shelf + high-pass), coefficients at 48 kHz
+    z = np.exp(-2j * np.pi * freqs / 48000)
+    shelf = (1.53512485958697 - 2.69169618940638 * z + 1.19839281085285 * z ** 2) / (1 - 1.69065929318241 * z + 0.73248077421585 * z ** 2)
+    highpass = (1.0 - 2.0 * z + 1.0 * z ** 2) / (1 - 1.99004745483398 * z + 0.99007225036621 * z ** 2)
+    return np.abs(shelf * highpass) ** 2
+
+def integrated_loudness(samples, rate=SAMPLE_RATE):
+    """
+    Gated integrated loudness (LUFS) of a mono signal after BS.1770: 400 ms
+    blocks with 75% overlap, K-weighted in the frequency domain, then absolute
+    (-70 LUFS) and relative (-10 LU) gating.
+    """
+    block, hop = int(0.4 * rate), int(0.1 * rate)
+    if len(samples) < block:
+        return None
+    frames = np.lib.stride_tricks.sliding_window_view(samples, block)[::hop]
+    weights = _k_weighting_power(np.fft.rfftfreq(block, 1 / rate))
+    power = np.empty(len(frames))
+    # a few hundred blocks at a time keeps the spectra at a few MB
+    for start in range(0, len(frames), 256):
+        spectrum = np.abs(np.fft.rfft(frames[start:start + 256], axis=1)) ** 2
+        power[start:start + 256] = (spectrum * weights).sum(axis=1) * 2 / block ** 2
+    loudness = -0.691 + 10 * np.log10(power + 1e-12)
+    gated = power[loudness > -70]
+    if not gated.size:
+        return None
+    relative = -0.691 + 10 * np.log10(gated.mean()) - 10
+    gated = power[(loudness > -70) & (loudness > relative)]
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+def silence_bounds(samples, rate=SAMPLE_RATE):
+    """Returns (start, end) in seconds of the audible part; start is 0 and end None when there is nothing worth skipping."""
+    hop = int(0.05 * rate)
+    count = len(samples) // hop
+    if count == 0:
+        return 0.0, None
+    rms = np.sqrt(np.mean(samples[:count * hop].reshape(count, hop) ** 2, axis=1))
+    audible = np.flatnonzero(20 * np.log10(rms + 1e-10) > SILENCE_DB)
+    if not audible.size:
+        return 0.0, None
+    duration = len(samples) / rate
+    start = float(audible[0] * hop / rate)
+    end = float((audible[-1] + 1) * hop / rate)
+    return (start if start >= MIN_SILENCE else 0.0), (end if duration - end >= MIN_SILENCE else None)
+
+BANDS = 12
+FFT_SIZE = 2048
+MAX_FRAMES = 2000
+
+def _band_edges(rate=SAMPLE_RATE):
+    # log-spaced bands from 60 Hz to Nyquist, as rfft bin indices
+    freqs = np.geomspace(60, rate / 2, BANDS + 1)
+    return np.clip((freqs / (rate / 2) * (FFT_SIZE // 2)).astype(int), 1, FFT_SIZE // 2)
+
+def estimate_tempo(samples, rate=SAMPLE_RATE):
+    """Tempo in BPM from the autocorrelation of the energy onset envelope, 0 if there is no clear beat."""
+    hop = 512
+    count = len(samples) // hop
+    if count < 64:
+        return 0.0
+    energy = np.sqrt(np.mean(samples[:count * hop].reshape(count, hop) ** 2, axis=1))
+    onset = np.maximum(np.diff(energy), 0)
+    onset -= onset.mean()
+    spectrum = np.fft.rfft(onset, 2 * len(onset))
+    autocorr = np.fft.irfft(np.abs(spectrum) ** 2)[:len(onset)]
+    frame_rate = rate / hop
+    low, high = int(frame_rate * 60 / 200), int(frame_rate * 60 / 60)
+    if high >= len(autocorr) or autocorr[0] <= 0:
+        return 0.0
+    lag = low + int(np.argmax(autocorr[low:high]))
+    return float(60 * frame_rate / lag)
+
+def feature_vector(samples, rate=SAMPLE_RATE):
+    """
+    Timbre and rhythm summary of a track: mean and spread of log band
+    energies, spectral centroid, roll-off and flatness, zero-crossing rate,
+    loudness spread and tempo. FEATURE_DIM float32 values.
+    """
+    if len(samples) < FFT_SIZE * 4:
+        return None
+    starts = np.linspace(0, len(samples) - FFT_SIZE, min(MAX_FRAMES, len(samples) // FFT_SIZE)).astype(int)
+    frames = samples[starts[:, None] + np.arange(FFT_SIZE)] * np.hanning(FFT_SIZE).astype(np.float32)
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2 + 1e-12
+    freqs = np.fft.rfftfreq(FFT_SIZE, 1 / rate)
+    total = power.sum(axis=1)
+
+    edges = _band_edges(rate)
+    bands = np.log10(np.add.reduceat(power, edges[:-1], axis=1)[:, :BANDS] + 1e-12)
+    centroid = (power * freqs).sum(axis=1) / total / (rate / 2)
+    rolloff = np.argmax(np.cumsum(power, axis=1) >= 0.85 * total[:, None], axis=1) / power.shape[1]
+    flatness = np.exp(np.log(power).mean(axis=1)) / power.mean(axis=1)
+    zcr = np.mean(np.abs(np.diff(np.sign(frames), axis=1)) > 0, axis=1)
+    rms = np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-6)
+
+    vector = np.concatenate([
+        bands.mean(axis=0), bands.std(axis=0),
+        [centroid.mean(), centroid.std(), rolloff.mean(), flatness.mean(), zcr.mean(), rms.mean(), rms.std(),
+         estimate_tempo(samples, rate) / 200],
+    ]).astype(np.float32)
+    return vector if vector.shape == (FEATURE_DIM,) and np.all(np.isfinite(vector)) else None
+
+def _analyse(job):
+    # decodes once and runs every analysis the row is still missing
+    song_id, path, done_bits = job
+    result = {"id": song_id, "bits": ALL_ANALYSES & ~(done_bits or 0), "features": None, "peaks": None,
+              "loudness": None, "gain_db": None, "silence_start": None, "silence_end": None}
+    try:
+        samples = np.frombuffer(decode_pcm(path, SAMPLE_RATE), dtype=np.float32)
+    except Exception as e:
+        print(f"Could not decode {path}: {e}")
+        if not os.path.exists(path):
+            # moved or evicted since the job started: leave the row for the next run
+            result["bits"] = 0
+        return result
+    if result["bits"] & ANALYSED_LOUDNESS:
+        loudness = integrated_loudness(samples)
+        if loudness is not None:
+            result["loudness"] = round(loudness, 2)
+            result["gain_db"] = round(float(np.clip(TARGET_LUFS - loudness, -MAX_GAIN_DB, MAX_GAIN_DB)), 2)
+        start, end = silence_bounds(samples)
+        result["silence_start"] = round(start, 2) if start else None
+        result["silence_end"] = round(end, 2) if end else None
+    if result["bits"] & ANALYSED_FEATURES:
+        result["features"] = feature_vector(samples)
+    if result["bits"] & ANALYSED_PEAKS:
+        result["peaks"] = compute_peaks(samples)
+    return result
+
+def _save(batch):
+    loudness = [r for r in batch if r["bits"] & ANALYSED_LOUDNESS]
+    features = [r for r in batch if r["bits"] & ANALYSED_FEATURES]
+    DbService.save_loudness(loudness, ANALYSED_LOUDNESS)
+    with_vectors = [r for r in features if r["features"] is not None]
+    rows = append_features([r["features"] for r in with_vectors])
+    feature_rows = {r["id"]: row for r, row in zip(with_vectors, rows)}
+    DbService.save_feature_rows([(feature_rows.get(r["id"]), r["id"]) for r in features], ANALYSED_FEATURES)
+    peaks = [r for r in batch if r["bits"] & ANALYSED_PEAKS]
+    with_peaks = [r for r in peaks if r["peaks"] is not None]
+    peak_rows = dict(zip((r["id"] for r in with_peaks), append_peaks([r["peaks"] for r in with_peaks])))
+    DbService.save_peak_rows([(peak_rows.get(r["id"]), r["id"]) for r in peaks], ANALYSED_PEAKS)
+    return sum(1 for r in batch if r["bits"])
+
+def analyse_library(stop_event=None):
+    """
+    Decodes every track that has not been analysed yet, once, in a low-priority
+    process pool. Loudness, gain and silence offsets are stored with the row,
+    feature vectors and waveform peaks in their memory-mapped files.
+    Tracks that fail to decode are marked as analysed too, so they are not
+    retried on every start; tracks whose file is gone are left for the next run. Returns the number of analysed tracks.
+    """
+    rows = [row for row in DbService.get_files_to_analyse(ALL_ANALYSES) if os.path.exists(row[1])]
+    if not rows:
+        return 0
+    done = 0
+    batch = []
+    with ProcessPoolExecutor(max_workers=max(1, DbService.get_performance_workers() // 2), initializer=lower_process_priority) as pool:
+        for result in pool.map(_analyse, rows, chunksize=4):
+            batch.append(result)
+            if len(batch) >= BATCH_SIZE:
+                done += _save(batch)
+                batch = []
+            if stop_event is not None and stop_event.is_set():
+                pool.shutdown(cancel_futures=True)
+                break
+    if batch:
+        done += _save(batch)
+    print(f"Analysis: analysed {done} tracks")
+    return done
+
+def start_analysis(on_done=None, stop_event=None):
+    stop_event = stop_event or threading.Event()
+    def run():
+        if not activity.wait_until_idle(stop_event, settle=2.0):
+            return
+        try:
+            done = analyse_library(stop_event)
+        except Exception as e:
+            print(f"Track analysis failed: {e}")
+            return
+        if on_done:
+            on_done(done)
+    threading.Thread(target=run, daemon=True).start()
+    return stop_event
@@ -0,0 +1,116 @@
+import glob, os, threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from . import activity
+from .db import DbService, remove_managed_file
+from .media import encode_opus, verify_audio, lower_process_priority
+from .storage import quota_lock
+from .utils import AUDIO_DIR, is_managed_path
+
+BATCH_SIZE = 20
+
+def _encode(job):
+    path, duration, bitrate = job
+    try:
+        target = encode_opus(path, os.path.splitext(path)[0], bitrate)
+    except Exception as e:
+        print(f"Could not re-encode {path}: {e}")
+        return None
+    if verify_audio(target, duration=duration) is None:
+        try:
+            os.remove(target)
+        except OSError:
+            pass
+        return None
+    return target
+
+def archive_library(bitrate, stop_event):
+    """
+    Re-encodes downloaded tracks that are not Opus yet, a few at a time and only
+    while the UI is idle. Each file is encoded next to the original, checked,
+    and committed to the DB in batches before the original is deleted, so the
+    job can stop at any point and simply continues with the remaining files
+    next time. Returns the number of bytes reclaimed.
+    """
+    for leftover in glob.glob(os.path.join(glob.escape(AUDIO_DIR), "*.tmp.opus")):
+        remove_managed_file(leftover)
+    rows = [row for row in DbService.get_archive_candidates() if is_managed_path(row[0]) and os.path.exists(row[0])]
+    if not rows:
+        return 0
+
+    workers = max(1, DbService.get_performance_workers() // 2)
+    reclaimed = encoded = 0
+    batch = []
+
+    def flush():
+        nonlocal reclaimed, encoded
+        with quota_lock:
+            moves = []
+            for old, new in batch:
+                # started playing, preloaded, or evicted since it was encoded: try again next run
+                if old in (activity.now_playing(), activity.preloaded()) or not os.path.exists(old):
+                    remove_managed_file(new)
+                else:
+                    moves.append((old, new))
+            batch.clear()
+            if not moves:
+                return
+            DbService.relocate_files([(new, os.path.getsize(new), os.path.getmtime(new), old) for old, new in moves])
+            for old, new in moves:
+                reclaimed += os.path.getsize(old) - os.path.getsize(new)
+                remove_managed_file(old)
+        encoded += len(moves)
+
+    pending = {}
+    queue = deque(rows)
+    with ProcessPoolExecutor(max_workers=workers, initializer=lower_process_priority) as pool:
+        while (queue or pending) and not stop_event.is_set():
+            # only start new encodes while nobody is using the app
+            while queue and len(pending) < workers and activity.is_idle(settle=2.0):
+                path, duration = queue.popleft()
+                if path in (activity.now_playing(), activity.preloaded()):
+                    continue
+                pending[pool.submit(_encode, (path, duration, bitrate))] = path
+            if not pending:
+                if not activity.wait_until_idle(stop_event, settle=2.0):
+                    break
+                continue
+            done, _ = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+            for future in done:
+                old = pending.pop(future)
+                new = future.result()
+                if new is not None:
+                    batch.append((old, new))
+            if len(batch) >= BATCH_SIZE:
+                flush()
+        # stopped: keep whatever is already being encoded instead of orphaning it
+        for future, old in pending.items():
+            new = future.result()
+            if new is not None:
+                batch.append((old, new))
+    flush()
+    print(f"Archive: re-encoded {encoded} tracks to {bitrate} kbps Opus, reclaimed {reclaimed / 1048576:.1f} MB")
+    return reclaimed
+
+def start_archive(on_done=None, stop_event=None):
+    stop_event = stop_event or threading.Event()
+    if DbService.get_setting("archive_opus", "0") != "1":
+        if on_done:
+            on_done(0)
+        return stop_event
+    try:
+        bitrate = max(24, int(DbService.get_setting("archive_bitrate_kbps", "96")))
+    except ValueError:
+        bitrate = 96
+    def run():
+        if not activity.wait_until_idle(stop_event, settle=2.0):
+            return
+        reclaimed = 0
+        try:
+            reclaimed = archive_library(bitrate, stop_event)
+        except Exception as e:
+            print(f"Archive job failed: {e}")
+        if on_done:
+            on_done(reclaimed)
+    threading.Thread(target=run, daemon=True).start()
+    return stop_event
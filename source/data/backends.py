@@ -0,0 +1,172 @@
+import os, struct, time, requests
+from urllib.parse import urlsplit, parse_qs
+from yt_dlp import YoutubeDL
+
+class ExtractorBackend:
+    """
+    What the download pipeline needs from the outside world: playlist
+    extraction, fetching one track and fetching a thumbnail. `download` returns
+    yt-dlp style info (`requested_downloads`, `chapters`, ...) and lets
+    exceptions raised by the progress hooks, like DownloadCancelled, propagate.
+    """
+    __slots__ = []
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def extract_playlist(self, link):
+        raise NotImplementedError
+
+    def download(self, url, progress_hooks):
+        raise NotImplementedError
+
+    def fetch_thumbnail(self, url, target):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class YtDlpBackend(ExtractorBackend):
+    __slots__ = ['ydl_opts', '_ydl']
+    def __init__(self, ydl_opts):
+        self.ydl_opts = ydl_opts
+        self._ydl = None
+
+    def extract_playlist(self, link):
+        if self._ydl is None:
+            self._ydl = YoutubeDL(self.ydl_opts)
+        return self._ydl.extract_info(link, download=False)
+
+    def download(self, url, progress_hooks):
+        with YoutubeDL(dict(self.ydl_opts, progress_hooks=progress_hooks)) as ydl:
+            return ydl.extract_info(url, download=True)
+
+    def fetch_thumbnail(self, url, target):
+        r = requests.get(url, timeout=10)
+        if r.status_code != 200:
+            return False
+        with open(target, 'wb') as f:
+            f.write(r.content)
+        return True
+
+    def close(self):
+        if self._ydl is not None:
+            self._ydl.close()
+            self._ydl = None
+
+class FakeBackend(ExtractorBackend):
+    """
+    Offline stand-in that serves a synthetic playlist, so the pipeline can be
+    exercised and benchmarked without the network. Configured from the link:
+
+        fake://<name>?tracks=20&size=2000000&latency=0.05&bandwidth=0&source=<audio file>
+
+    `size` is bytes per track, `latency` seconds before each request answers and
+    `bandwidth` bytes per second per download (0 = unthrottled). With `source`
+    every track is a copy of that file instead of silent 16-bit stereo WAV,
+    which ffprobe accepts and "native" mode keeps without running ffmpeg.
+    """
+    __slots__ = ['name', 'tracks', 'size', 'latency', 'bandwidth', 'source', 'outtmpl', 'chunk_size']
+    def __init__(self, name="fake", tracks=20, size=2_000_000, latency=0.0, bandwidth=0, source=None,
+                 outtmpl="%(id)s.%(ext)s", chunk_size=64 * 1024):
+        self.name = name
+        self.tracks = tracks
+        self.size = os.path.getsize(source) if source else size
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.source = source
+        self.outtmpl = outtmpl
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_link(cls, link, ydl_opts=None):
+        parts = urlsplit(link)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        return cls(
+            name=parts.netloc or "fake",
+            tracks=int(query.get("tracks", 20)),
+            size=int(query.get("size", 2_000_000)),
+            latency=float(query.get("latency", 0)),
+            bandwidth=int(query.get("bandwidth", 0)),
+            source=query.get("source"),
+            outtmpl=(ydl_opts or {}).get("outtmpl", "%(id)s.%(ext)s"),
+        )
+
+    def _entry(self, number):
+        video_id = f"fake-{self.name}-{number:04d}"
+        return {
+            "id": video_id,
+            "title": f"{self.name} track {number}",
+            "duration": 180,
+            "webpage_url": f"fake://track/{video_id}",
+            "thumbnail": f"fake://thumb/{video_id}",
+        }
+
+    def extract_playlist(self, link):
+        time.sleep(self.latency)
+        return {"id": self.name, "title": self.name, "entries": [self._entry(n) for n in range(1, self.tracks + 1)]}
+
+    def download(self, url, progress_hooks):
+        video_id = url.rsplit("/", 1)[-1]
+        number = int(video_id.rsplit("-", 1)[-1])
+        ext = os.path.splitext(self.source)[1].lstrip(".") if self.source else "wav"
+        path = self.outtmpl.replace("%(id)s", video_id).replace("%(ext)s", ext)
+        time.sleep(self.latency)
+        def emit(status, done):
+            for hook in progress_hooks:
+                hook({"status": status, "downloaded_bytes": done, "total_bytes": self.size, "filename": path})
+        source = open(self.source, "rb") if self.source else None
+        try:
+            with open(path, "wb") as f:
+                done = 0
+                filler = b"\0" * self.chunk_size
+                if not source:
+                    data_size = self.size - 44
+                    f.write(b"RIFF" + struct.pack("<I", 36 + data_size) + b"WAVEfmt "
+                            + struct.pack("<IHHIIHH", 16, 1, 2, 44100, 44100 * 4, 4, 16)
+                            + b"data" + struct.pack("<I", data_size))
+                    done = 44
+                started = time.monotonic()
+                while done < self.size:
+                    chunk = source.read(self.chunk_size) if source else filler[:self.size - done]
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    done += len(chunk)
+                    if self.bandwidth > 0:
+                        ahead = done / self.bandwidth - (time.monotonic() - started)
+                        if ahead > 0:
+                            time.sleep(ahead)
+                    emit("downloading", done)
+        except BaseException:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            raise
+        finally:
+            if source:
+                source.close()
+        emit("finished", done)
+        info = dict(self._entry(number))
+        info["requested_downloads"] = [{"filepath": path}]
+        info["chapters"] = None
+        return info
+
+    def fetch_thumbnail(self, url, target):
+        time.sleep(self.latency)
+        with open(target, 'wb') as f:
+            f.write(b"\xff\xd8\xff\xd9")
+        return True
+
+# link scheme -> backend; anything else goes through yt-dlp
+BACKENDS = {
+    "fake": FakeBackend.from_link,
+}
+
+def backend_for(link, ydl_opts):
+    factory = BACKENDS.get(urlsplit(link).scheme)
+    return factory(link, ydl_opts) if factory else YtDlpBackend(ydl_opts)
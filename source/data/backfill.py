@@ -0,0 +1,56 @@
+import os, threading
+from concurrent.futures import ProcessPoolExecutor
+from . import activity
+from .db import DbService
+from .media import probe_file
+
+BATCH_SIZE = 200
+
+def _probe_duration(path):
+    try:
+        info = probe_file(path)
+    except Exception as e:
+        print(f"Could not probe {path}: {e}")
+        return None
+    if not info or not info["duration"]:
+        return None
+    return int(round(info["duration"]))
+
+def backfill_durations(stop_event=None):
+    """
+    Probes every track whose stored duration is missing or unusable and writes
+    the real durations back in batches. Returns the number of rows updated.
+    """
+    rows = [(song_id, path) for song_id, path in DbService.get_files_missing_duration() if os.path.exists(path)]
+    if not rows:
+        return 0
+    updated = 0
+    batch = []
+    with ProcessPoolExecutor(max_workers=DbService.get_performance_workers()) as pool:
+        for (song_id, _), duration in zip(rows, pool.map(_probe_duration, [path for _, path in rows], chunksize=8)):
+            if duration:
+                batch.append((duration, song_id))
+            if len(batch) >= BATCH_SIZE:
+                updated += DbService.update_durations(batch)
+                batch = []
+            if stop_event is not None and stop_event.is_set():
+                pool.shutdown(cancel_futures=True)
+                break
+    updated += DbService.update_durations(batch)
+    print(f"Duration backfill: probed {len(rows)} tracks, updated {updated}")
+    return updated
+
+def start_duration_backfill(on_done=None, stop_event=None):
+    stop_event = stop_event or threading.Event()
+    def run():
+        if not activity.wait_until_idle(stop_event, settle=2.0):
+            return
+        updated = 0
+        try:
+            updated = backfill_durations(stop_event)
+        except Exception as e:
+            print(f"Duration backfill failed: {e}")
+        if on_done:
+            on_done(updated)
+    threading.Thread(target=run, daemon=True).start()
+    return stop_event
@@ -0,0 +1,47 @@
+import json, threading, time
+from .db import DbService
+
+INTERVAL = 5.0
+
+class Checkpointer:
+    """
+    Coalesces playback state updates and writes only the latest one, at most
+    once every INTERVAL seconds, as a single settings row. Position ticks just
+    replace the pending state in memory; flush() writes it straight away (on
+    pause and quit).
+    """
+    __slots__ = ['_lock', '_pending', '_timer', '_last_write', '_written']
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = None
+        self._timer = None
+        self._last_write = 0.0
+        self._written = None
+
+    def update(self, state):
+        with self._lock:
+            self._pending = state
+            if self._timer is None:
+                delay = max(0.0, INTERVAL - (time.monotonic() - self._last_write))
+                self._timer = threading.Timer(delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            state, self._pending = self._pending, None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if state is None or state == self._written:
+                return
+            self._last_write = time.monotonic()
+            self._written = state
+        DbService.set_setting("playback_checkpoint", json.dumps(state))
+
+def load_checkpoint():
+    try:
+        state = json.loads(DbService.get_setting("playback_checkpoint", "") or "null")
+    except ValueError:
+        return None
+    return state if isinstance(state, dict) and state.get("id") is not None else None
@@ -1,6 +1,7 @@
 from pathlib import Path
-import sqlite3, json, os
-from .utils import DB_FILE, AUDIO_DIR, THUMBNAIL_DIR
+import sqlite3, json, os, time
+from .utils import DB_FILE, BASE_DIR, AUDIO_DIR, THUMBNAIL_DIR, is_managed_path
+from . import events
 from concurrent.futures import ThreadPoolExecutor
 
 def safe_remove(file_path):
@@ -12,6 +13,11 @@ def safe_remove(file_path):
         print(f"File deletion failed: {e}")
     return False
 
+def remove_managed_file(file_path):
+    if file_path and is_managed_path(file_path):
+        return safe_remove(file_path)
+    return False
+
 class DbService:
     __slots__ = []
     @staticmethod
@@ -24,7 +30,7 @@ class DbService:
     def reset_application_data():
         print("Starting application data reset...")
         workers = DbService.get_performance_workers()
-        files_to_delete = [ f for d in (AUDIO_DIR, THUMBNAIL_DIR) for f in Path(d).iterdir() if f.is_file()]
+        files_to_delete = [ f for d in (BASE_DIR, AUDIO_DIR, THUMBNAIL_DIR) for f in Path(d).iterdir() if f.is_file()]
         if files_to_delete:
             with ThreadPoolExecutor(max_workers=workers) as pool:
                 pool.map(safe_remove, files_to_delete)
@@ -60,7 +66,23 @@ class DbService:
                 "volume": "0.4",
                 "cookies": "",
                 "favourites": "[]",
-                "performance": "2"
+                "performance": "2",
+                "download_mode": "mp3",
+                "progress_fps": "10",
+                "position_fps": "4",
+                "fetch_workers": "3",
+                "thumbnail_workers": "2",
+                "download_processes": "1",
+                "sync_interval_minutes": "60",
+                "sync_max_concurrent": "1",
+                "sync_host_interval_seconds": "30",
+                "bandwidth_limit_kbps": "0",
+                "split_chapters": "0",
+                "storage_quota_mb": "0",
+                "archive_opus": "0",
+                "archive_bitrate_kbps": "96",
+                "normalize_loudness": "1",
+                "skip_silence": "1"
             }
             c.executemany("INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)", defaults.items())
             conn.commit()
@@ -97,6 +119,21 @@ class DbService:
                     FOREIGN KEY (playlist_id) REFERENCES playlists (id) ON DELETE CASCADE
                 )
             """)
+            DbService._ensure_columns(c, "files", [
+                ("size", "INTEGER"),
+                ("mtime", "REAL"),
+                ("last_played", "REAL"),
+                ("pinned", "INTEGER DEFAULT 0"),
+                ("cloud", "INTEGER DEFAULT 0"),
+                ("analysed", "INTEGER DEFAULT 0"),
+                ("loudness", "REAL"),
+                ("gain_db", "REAL"),
+                ("silence_start", "REAL"),
+                ("silence_end", "REAL"),
+                ("feature_row", "INTEGER"),
+                ("peaks_row", "INTEGER"),
+            ])
+            c.execute("CREATE INDEX IF NOT EXISTS idx_files_playlist ON files (playlist_id, song_index)")
             conn.commit()
         except Exception as e:
             print(f"Error in init_db: {e}")
@@ -104,6 +141,13 @@ class DbService:
             if conn:
                 conn.close()
 
+    @staticmethod
+    def _ensure_columns(c, table, columns):
+        existing = {row[1] for row in c.execute(f"PRAGMA table_info({table})")}
+        for name, declaration in columns:
+            if name not in existing:
+                c.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+
     @staticmethod
     def set_setting(key, value):
         conn = None
@@ -112,8 +156,10 @@ class DbService:
             c = conn.cursor()
             c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
             conn.commit()
+            return True
         except Exception as e:
             print(f"Error in set_setting: {e}")
+            return False
         finally:
             if conn:
                 conn.close()
@@ -174,6 +220,49 @@ class DbService:
         
 
 
+    @staticmethod
+    def get_pipeline_workers():
+        """
+        Worker pool sizes for each download stage. Fetching and thumbnails are
+        network bound and have their own settings, post-processing is CPU bound
+        and follows the performance setting, and DB registration keeps a single
+        writer.
+        """
+        def setting_int(key, default):
+            try:
+                return max(1, int(DbService.get_setting(key, str(default))))
+            except ValueError:
+                return default
+        return {
+            "fetch": setting_int("fetch_workers", 3),
+            "postprocess": DbService.get_performance_workers(),
+            "thumbnail": setting_int("thumbnail_workers", 2),
+            "register": 1
+        }
+
+    @staticmethod
+    def get_bandwidth_limit():
+        # bytes per second, 0 means unlimited
+        try:
+            return max(0, int(DbService.get_setting("bandwidth_limit_kbps", "0"))) * 1024
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def get_storage_quota():
+        # bytes, 0 means unlimited
+        try:
+            return max(0, int(DbService.get_setting("storage_quota_mb", "0"))) * 1024 * 1024
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def get_progress_fps():
+        try:
+            return max(1, int(DbService.get_setting("progress_fps", "10")))
+        except ValueError:
+            return 10
+
     @staticmethod
     def toggle_favourite(file_path: str):
         favs = DbService.get_favourites()
@@ -181,7 +270,26 @@ class DbService:
             favs.remove(file_path)
         else:
             favs.append(file_path)
-        DbService.set_setting("favourites", json.dumps(favs))
+        if not DbService.set_setting("favourites", json.dumps(favs)):
+            return False
+        events.publish(events.FAVOURITE_TOGGLED, DbService.get_playlist_name_of(file_path), file_path)
+        return True
+
+    @staticmethod
+    def get_playlist_name_of(file_path: str):
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            c.execute("SELECT p.name FROM files f JOIN playlists p ON p.id = f.playlist_id WHERE f.file_path = ?", (file_path,))
+            row = c.fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            print(f"Error in get_playlist_name_of: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
 
     @staticmethod
     def add_file(playlist_name, title, original_title, file_path, duration, thumbnail_path, link, song_index=None):
@@ -209,6 +317,7 @@ class DbService:
             """, (playlist_id, title, original_title, file_path, duration, thumbnail_path, link, song_index))
             
             conn.commit()
+            events.publish(events.TRACK_ADDED, playlist_name, file_path)
         except Exception as e:
             print(f"Error in add_file: {e}")
             if conn:
@@ -217,6 +326,416 @@ class DbService:
             if conn:
                 conn.close()
 
+    @staticmethod
+    def add_files(playlist_name, songs):
+        """
+        Inserts many songs into one playlist in a single transaction. Each song is a
+        dict with the add_file fields plus optional size/mtime; songs whose
+        file_path already exists are updated in place instead.
+        """
+        if not songs:
+            return 0
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            c.execute("SELECT id FROM playlists WHERE name = ?", (playlist_name,))
+            playlist_id_row = c.fetchone()
+            if not playlist_id_row:
+                print(f"Error: Playlist '{playlist_name}' not found.")
+                return 0
+            playlist_id = playlist_id_row[0]
+
+            c.execute("SELECT MAX(song_index) FROM files WHERE playlist_id = ?", (playlist_id,))
+            max_index = c.fetchone()[0]
+            next_index = 0 if max_index is None else max_index + 1
+
+            rows = []
+            for song in songs:
+                song_index = song.get("song_index")
+                if song_index is None:
+                    song_index = next_index
+                    next_index += 1
+                rows.append((
+                    playlist_id, song.get("title"), song.get("original_title", song.get("title")), song["file_path"],
+                    song.get("duration"), song.get("thumbnail_path"), song.get("link"), song_index,
+                    song.get("size"), song.get("mtime")
+                ))
+            c.executemany("""
+                INSERT INTO files (playlist_id, title, original_title, file_path, duration, thumbnail_path, link, song_index, size, mtime)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(file_path) DO UPDATE SET
+                    original_title = excluded.original_title,
+                    duration = excluded.duration,
+                    thumbnail_path = COALESCE(excluded.thumbnail_path, files.thumbnail_path),
+                    size = excluded.size,
+                    mtime = excluded.mtime,
+                    cloud = 0
+            """, rows)
+            conn.commit()
+            events.publish(events.TRACK_ADDED, playlist_name)
+            return len(rows)
+        except Exception as e:
+            print(f"Error in add_files: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def get_files_missing_duration():
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            c.execute("""
+                SELECT id, file_path FROM files
+                WHERE duration IS NULL
+                   OR typeof(duration) NOT IN ('integer', 'real')
+                   OR duration <= 0
+            """)
+            return c.fetchall()
+        except Exception as e:
+            print(f"Error in get_files_missing_duration: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def update_durations(updates):
+        """`updates` is a list of (duration, song_id) pairs written in one transaction."""
+        if not updates:
+            return 0
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            c.executemany("UPDATE files SET duration = ? WHERE id = ?", updates)
+            conn.commit()
+            return len(updates)
+        except Exception as e:
+            print(f"Error in update_durations: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def get_files_for_verification():
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            c.execute("""
+                SELECT f.id, f.file_path, f.size, f.duration, f.link, p.name, p.link
+                FROM files f JOIN playlists p ON p.id = f.playlist_id
+                WHERE COALESCE(f.cloud, 0) = 0
+            """)
+            return [{
+                "id": row[0], "file_path": row[1], "size": row[2], "duration": row[3],
+                "link": row[4], "playlist_name": row[5], "playlist_link": row[6],
+            } for row in c.fetchall()]
+        except Exception as e:
+            print(f"Error in get_files_for_verification: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def mark_played(file_path: str):
+        conn = None
+        try:
+            conn = DbService._connect()
+            conn.execute("UPDATE files SET last_played = ? WHERE file_path = ?", (time.time(), file_path))
+            conn.commit()
+        except Exception as e:
+            print(f"Error in mark_played: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def toggle_pinned(file_path: str):
+        conn = None
+        try:
+            conn = DbService._connect()
+            conn.execute("UPDATE files SET pinned = 1 - COALESCE(pinned, 0) WHERE file_path = ?", (file_path,))
+            conn.commit()
+            events.publish(events.PLAYLIST_CHANGED, DbService.get_playlist_name_of(file_path), file_path)
+            return True
+        except Exception as e:
+            print(f"Error in toggle_pinned: {e}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def get_eviction_candidates():
+        """Re-downloadable, unpinned tracks still on disk, least recently played first."""
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            c.execute("""
+                SELECT file_path FROM files
+                WHERE COALESCE(cloud, 0) = 0 AND COALESCE(pinned, 0) = 0 AND link IS NOT NULL AND link != ''
+                ORDER BY COALESCE(last_played, 0) ASC, id ASC
+            """)
+            return [row[0] for row in c.fetchall()]
+        except Exception as e:
+            print(f"Error in get_eviction_candidates: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def set_cloud(file_path: str):
+        conn = None
+        try:
+            conn = DbService._connect()
+            conn.execute("UPDATE files SET cloud = 1, size = NULL, mtime = NULL WHERE file_path = ?", (file_path,))
+            conn.commit()
+            events.publish(events.PLAYLIST_CHANGED, DbService.get_playlist_name_of(file_path), file_path)
+        except Exception as e:
+            print(f"Error in set_cloud: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def restore_file(old_path: str, new_path: str, size, mtime):
+        """Brings an evicted track back, possibly under a new extension."""
+        conn = None
+        try:
+            conn = DbService._connect()
+            conn.execute("""
+                UPDATE files SET file_path = ?, size = ?, mtime = ?, cloud = 0
+                WHERE file_path = ?
+            """, (new_path, size, mtime, old_path))
+            conn.commit()
+            events.publish(events.TRACK_MOVED, DbService.get_playlist_name_of(new_path), old_path, new_path)
+        except Exception as e:
+            print(f"Error in restore_file: {e}")
+            if conn:
+                conn.rollback()
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def get_files_to_analyse(mask: int):
+        """Rows still missing any analysis in `mask`, as (id, file_path, analysed)."""
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            c.execute("""
+                SELECT id, file_path, COALESCE(analysed, 0) FROM files
+                WHERE (COALESCE(analysed, 0) & ?) != ? AND COALESCE(cloud, 0) = 0
+                ORDER BY id ASC
+            """, (mask, mask))
+            return c.fetchall()
+        except Exception as e:
+            print(f"Error in get_files_to_analyse: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def save_loudness(results, bit: int):
+        """Stores analysis results ({id, loudness, gain_db, silence_start, silence_end}) and sets `bit` in analysed."""
+        if not results:
+            return 0
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            c.executemany("""
+                UPDATE files
+                SET loudness = ?, gain_db = ?, silence_start = ?, silence_end = ?, analysed = COALESCE(analysed, 0) | ?
+                WHERE id = ?
+            """, [(r["loudness"], r["gain_db"], r["silence_start"], r["silence_end"], bit, r["id"]) for r in results])
+            conn.commit()
+            return len(results)
+        except Exception as e:
+            print(f"Error in save_loudness: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def save_feature_rows(rows, bit: int):
+        """`rows` is a list of (feature_row or None, song_id); sets `bit` in analysed."""
+        if not rows:
+            return 0
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            c.executemany("UPDATE files SET feature_row = ?, analysed = COALESCE(analysed, 0) | ? WHERE id = ?",
+                          [(row, bit, song_id) for row, song_id in rows])
+            conn.commit()
+            return len(rows)
+        except Exception as e:
+            print(f"Error in save_feature_rows: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def save_peak_rows(rows, bit: int):
+        """`rows` is a list of (peaks_row or None, song_id); sets `bit` in analysed."""
+        if not rows:
+            return 0
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            c.executemany("UPDATE files SET peaks_row = ?, analysed = COALESCE(analysed, 0) | ? WHERE id = ?",
+                          [(row, bit, song_id) for row, song_id in rows])
+            conn.commit()
+            return len(rows)
+        except Exception as e:
+            print(f"Error in save_peak_rows: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def get_feature_rows():
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            c.execute("SELECT id, feature_row FROM files WHERE feature_row IS NOT NULL")
+            return c.fetchall()
+        except Exception as e:
+            print(f"Error in get_feature_rows: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def get_songs_by_ids(song_ids):
+        """Songs from any playlist, in the order of `song_ids`, skipping files that are gone."""
+        if not song_ids:
+            return []
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            favourites = DbService.get_favourites()
+            placeholders = ','.join(['?'] * len(song_ids))
+            c.execute(f"""
+                SELECT id, title, file_path, duration, thumbnail_path, link, song_index, original_title, pinned, cloud,
+                       gain_db, silence_start, silence_end, peaks_row
+                FROM files WHERE id IN ({placeholders})
+            """, list(song_ids))
+            rows_map = {row[0]: row for row in c.fetchall()}
+            songs = []
+            for song_id in song_ids:
+                row = rows_map.get(song_id)
+                if row is None or not (row[9] or os.path.exists(row[2])):
+                    continue
+                songs.append({
+                    "id": row[0], "title": row[1], "file_path": row[2],
+                    "duration": row[3], "thumbnail_path": row[4], "link": row[5],
+                    "song_index": row[6], "original_title": row[7],
+                    "is_favourite": row[2] in favourites,
+                    "pinned": bool(row[8]), "cloud": bool(row[9]),
+                    "gain_db": row[10], "silence_start": row[11], "silence_end": row[12], "peaks_row": row[13]
+                })
+            return songs
+        except Exception as e:
+            print(f"Error in get_songs_by_ids: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def get_archive_candidates():
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            c.execute("""
+                SELECT file_path, duration FROM files
+                WHERE COALESCE(cloud, 0) = 0 AND lower(file_path) NOT LIKE '%.opus'
+                ORDER BY id ASC
+            """)
+            return c.fetchall()
+        except Exception as e:
+            print(f"Error in get_archive_candidates: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def relocate_files(moves):
+        """`moves` is a list of (new_path, size, mtime, old_path); favourites follow their files."""
+        if not moves:
+            return
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            c.executemany("UPDATE files SET file_path = ?, size = ?, mtime = ? WHERE file_path = ?", moves)
+            conn.commit()
+        except Exception as e:
+            print(f"Error in relocate_files: {e}")
+            if conn:
+                conn.rollback()
+            return
+        finally:
+            if conn:
+                conn.close()
+        renamed = {old: new for new, _, _, old in moves}
+        favs = DbService.get_favourites()
+        if any(path in renamed for path in favs):
+            DbService.set_setting("favourites", json.dumps([renamed.get(path, path) for path in favs]))
+        for old, new in renamed.items():
+            events.publish(events.TRACK_MOVED, file_path=old, new_path=new)
+
+    @staticmethod
+    def get_file_stats_under(folder: str):
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            prefix = os.path.join(folder, "")
+            c.execute("""
+                SELECT file_path, size, mtime FROM files
+                WHERE substr(file_path, 1, ?) = ?
+            """, (len(prefix), prefix))
+            return {row[0]: (row[1], row[2]) for row in c.fetchall()}
+        except Exception as e:
+            print(f"Error in get_file_stats_under: {e}")
+            return {}
+        finally:
+            if conn:
+                conn.close()
+
     @staticmethod
     def file_exists(playlist_name: str, file_path: str) -> bool:
         conn = None
@@ -285,7 +804,8 @@ class DbService:
                 placeholders = ','.join(['?'] * len(existing_favourites))
                 
                 c.execute(f"""
-                    SELECT id, title, file_path, duration, thumbnail_path, link, song_index, original_title
+                    SELECT id, title, file_path, duration, thumbnail_path, link, song_index, original_title, pinned, cloud,
+                           gain_db, silence_start, silence_end, peaks_row
                     FROM files WHERE file_path IN ({placeholders})
                 """, existing_favourites)
                 
@@ -297,7 +817,9 @@ class DbService:
                         songs.append({
                             "id": row[0], "title": row[1], "file_path": row[2],
                             "duration": row[3], "thumbnail_path": row[4], "link": row[5],
-                            "song_index": row[6], "original_title": row[7], "is_favourite": True 
+                            "song_index": row[6], "original_title": row[7], "is_favourite": True,
+                            "pinned": bool(row[8]), "cloud": bool(row[9]),
+                            "gain_db": row[10], "silence_start": row[11], "silence_end": row[12], "peaks_row": row[13]
                         })
             
             else:
@@ -307,9 +829,10 @@ class DbService:
                     return []
 
                 c.execute("""
-                    SELECT id, title, file_path, duration, thumbnail_path, link, song_index, original_title
+                    SELECT id, title, file_path, duration, thumbnail_path, link, song_index, original_title, pinned, cloud,
+                           gain_db, silence_start, silence_end, peaks_row
                     FROM files WHERE playlist_id = ?
-                    ORDER BY song_index ASC
+                    ORDER BY song_index ASC, id ASC
                 """, (playlist_id[0],))
                 
                 rows = c.fetchall()
@@ -322,7 +845,8 @@ class DbService:
                     existing_mask = list(pool.map(os.path.exists, file_paths))
                 
                 for row, exists in zip(rows, existing_mask):
-                    if not exists:
+                    # evicted tracks stay listed and are fetched again when played
+                    if not exists and not row[9]:
                         continue
                         
                     file_path = row[2]
@@ -330,7 +854,9 @@ class DbService:
                         "id": row[0], "title": row[1], "file_path": file_path,
                         "duration": row[3], "thumbnail_path": row[4], "link": row[5],
                         "song_index": row[6], "original_title": row[7],
-                        "is_favourite": file_path in favourites
+                        "is_favourite": file_path in favourites,
+                        "pinned": bool(row[8]), "cloud": bool(row[9]),
+                        "gain_db": row[10], "silence_start": row[11], "silence_end": row[12], "peaks_row": row[13]
                     })
                     
             return songs
@@ -341,6 +867,25 @@ class DbService:
             if conn:
                 conn.close()
 
+    @staticmethod
+    def get_playlist_links():
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            c.execute("""
+                SELECT name, link FROM playlists
+                WHERE link LIKE 'http://%' OR link LIKE 'https://%'
+                ORDER BY id ASC
+            """)
+            return c.fetchall()
+        except Exception as e:
+            print(f"Error in get_playlist_links: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
     @staticmethod
     def get_playlist_by_link(link: str):
         conn = None
@@ -451,6 +996,10 @@ class DbService:
             conn.commit()
             if c.rowcount > 0:
                 print(f"Successfully updated title for song ID {song_id} to: {new_title}")
+                c.execute("SELECT f.file_path, p.name FROM files f JOIN playlists p ON p.id = f.playlist_id WHERE f.id = ?", (song_id,))
+                row = c.fetchone()
+                if row:
+                    events.publish(events.TRACK_RENAMED, row[1], row[0])
                 return True
             else:
                 print(f"Error: Song ID {song_id} not found.")
@@ -475,12 +1024,15 @@ class DbService:
                 return False
 
             song_id, thumb_path, playlist_id, deleted_index = row
+            c.execute("SELECT name FROM playlists WHERE id = ?", (playlist_id,))
+            playlist_name = c.fetchone()[0]
 
-            safe_remove(file_path)
-            safe_remove(thumb_path)
+            remove_managed_file(file_path)
+            remove_managed_file(thumb_path)
 
             favs = DbService.get_favourites()
-            if file_path in favs:
+            was_favourite = file_path in favs
+            if was_favourite:
                 favs.remove(file_path)
                 DbService.set_setting("favourites", json.dumps(favs))
 
@@ -493,6 +1045,9 @@ class DbService:
             """, (playlist_id, deleted_index))
             
             conn.commit()
+            events.publish(events.TRACK_REMOVED, playlist_name, file_path)
+            if was_favourite:
+                events.publish(events.FAVOURITE_TOGGLED, playlist_name, file_path)
             return True
         except Exception as e:
             print(f"Error in delete_song: {e}")
@@ -514,7 +1069,7 @@ class DbService:
             playlist_id_row = c.fetchone()
             if not playlist_id_row:
                 print(f"Error: Playlist '{playlist_name}' not found for reorder.")
-                return
+                return False
                 
             playlist_id = playlist_id_row[0]
             
@@ -529,10 +1084,13 @@ class DbService:
             """, updates)
             
             conn.commit()
+            events.publish(events.TRACK_REORDERED, playlist_name)
+            return True
         except Exception as e:
             print(f"Error reordering playlist: {e}")
             if conn:
                 conn.rollback()
+            return False
         finally:
             if conn:
                 conn.close()
@@ -576,6 +1134,22 @@ class DbService:
             if conn:
                 conn.close()
 
+    @staticmethod
+    def get_playlist_name_by_link(link):
+        conn = None
+        try:
+            conn = DbService._connect()
+            c = conn.cursor()
+            c.execute("SELECT name FROM playlists WHERE link = ?", (link,))
+            row = c.fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            print(f"Error in get_playlist_name_by_link: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
     @staticmethod
     def add_playlist(name, link):
         conn = None
@@ -584,6 +1158,7 @@ class DbService:
             c = conn.cursor()
             c.execute("INSERT INTO playlists (name, link) VALUES (?, ?)", (name, link))
             conn.commit()
+            events.publish(events.PLAYLIST_CHANGED, name)
             return True
         except sqlite3.IntegrityError:
             print(f"Playlist '{name}' already exists.")
@@ -605,6 +1180,8 @@ class DbService:
             c = conn.cursor()
             c.execute("UPDATE playlists SET name = ? WHERE name = ?", (new_name, old_name))
             conn.commit()
+            events.publish(events.PLAYLIST_CHANGED, old_name)
+            events.publish(events.PLAYLIST_CHANGED, new_name)
             return True
         except sqlite3.IntegrityError:
             print(f"Playlist name '{new_name}' already exists.")
@@ -626,6 +1203,7 @@ class DbService:
             c = conn.cursor()
             c.execute("UPDATE playlists SET link = ? WHERE name = ?", (link, name))
             conn.commit()
+            events.publish(events.PLAYLIST_CHANGED, name)
         except Exception as e:
             print(f"Error in update_playlist: {e}")
             if conn:
@@ -657,7 +1235,7 @@ class DbService:
 
             if paths_to_delete:
                 with ThreadPoolExecutor() as pool:
-                    list(pool.map(safe_remove, paths_to_delete))
+                    list(pool.map(remove_managed_file, paths_to_delete))
 
             favs = DbService.get_favourites()
             deleted_file_paths = set(p[0] for p in files_to_delete)
@@ -668,6 +1246,9 @@ class DbService:
             c.execute("DELETE FROM files WHERE playlist_id = ?", (playlist_id,))
             c.execute("DELETE FROM playlists WHERE id = ?", (playlist_id,))
             conn.commit()
+            events.publish(events.PLAYLIST_CHANGED, name)
+            if len(new_favs) < len(favs):
+                events.publish(events.FAVOURITE_TOGGLED, name)
             return True
         except Exception as e:
             print(f"Error in delete_playlist: {e}")
@@ -0,0 +1,300 @@
+import itertools, multiprocessing, queue, threading, time
+from .db import DbService
+from . import events
+from .jobs import JobControl, BandwidthLimiter
+from .progress import ProgressAggregator, ProgressRelay
+from .youtube import run_playlist_download
+from .storage import schedule_quota_check, refetch_file
+
+def _control_loop(controls, running):
+    while True:
+        action, job_id = controls.get()
+        control = running.get(job_id)
+        if control is not None:
+            getattr(control, action)()
+
+def _worker_main(jobs, event_queue, controls, cancelled, taken, processes):
+    running = {}
+    limiter = BandwidthLimiter()
+    threading.Thread(target=_control_loop, args=(controls, running), daemon=True).start()
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        # recorded synchronously, unlike queued events, so a crash from here on fails the job
+        taken[job["id"]] = multiprocessing.current_process().pid
+        if cancelled.pop(job["id"], False):
+            # cancelled while still queued: the client has already released it
+            event_queue.put(("done", job["id"], "Cancelled"))
+            continue
+        control = running[job["id"]] = JobControl()
+        event_queue.put(("started", job["id"], multiprocessing.current_process().pid))
+        # the global cap is split evenly between worker processes
+        limiter.set_rate(DbService.get_bandwidth_limit() // processes)
+        relay = ProgressRelay(event_queue.put, job["id"])
+        try:
+            if job.get("kind") == "track":
+                event_queue.put(("fetched", job["id"], job["file_path"], refetch_file(job["link"], job["file_path"], job["title"])))
+                event_queue.put(("done", job["id"], None))
+                continue
+            run_playlist_download(job["link"], job["name"], relay, control, limiter)
+            event_queue.put(("done", job["id"], "Cancelled" if control.cancelled.is_set() else None))
+        except Exception as e:
+            event_queue.put(("done", job["id"], str(e)))
+        finally:
+            running.pop(job["id"], None)
+
+class DownloadClient:
+    """
+    Runs yt-dlp in separate worker processes so extraction and JSON parsing never
+    compete with the UI for the GIL. Jobs and events travel over queues; the UI
+    process only applies progress and results. If a worker dies, the job it was
+    running fails and a fresh worker takes over the remaining queue.
+
+    Jobs can be paused, resumed and cancelled one at a time or for a whole
+    playlist; the running job picks the change up from its progress hooks.
+
+    Single evicted tracks fetched again through submit_track run on a worker of
+    their own, so a track the user is waiting for never queues behind playlists.
+    """
+    __slots__ = ['processes', '_ctx', '_jobs', '_tracks', '_events', '_cancelled', '_taken', '_workers', '_pending', '_ids', '_lock', '_listener', '_track_listeners', '_results']
+    def __init__(self, processes=1):
+        self.processes = max(1, processes)
+        # spawn on every platform: forking a process that already runs UI threads is unsafe
+        self._ctx = multiprocessing.get_context("spawn")
+        self._jobs = self._ctx.Queue()
+        # single tracks the user is waiting for get a worker of their own, never queued behind playlists
+        self._tracks = self._ctx.Queue()
+        self._events = self._ctx.Queue()
+        # shared with the workers: ids of jobs cancelled before a worker picked them
+        # up, and the worker pid each job was taken by
+        self._cancelled = None
+        self._taken = None
+        self._workers = {}
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._listener = None
+        self._track_listeners = {}
+        self._results = {}
+
+    def submit(self, link, name, progress):
+        job_id = next(self._ids)
+        with self._lock:
+            self._pending[job_id] = {"progress": progress, "done": threading.Event(), "error": None, "pid": None,
+                                     "name": name, "state": "running"}
+            self._ensure_workers()
+        self._jobs.put({"id": job_id, "link": link, "name": name})
+        return job_id
+
+    def submit_track(self, link, file_path, title, on_done):
+        """Fetches one evicted track again; `on_done` gets the new path, or None if it failed."""
+        job_id = next(self._ids)
+        with self._lock:
+            self._pending[job_id] = {"progress": None, "done": threading.Event(), "error": None, "pid": None,
+                                     "name": None, "state": "running", "on_done": on_done, "new_path": None}
+            self._ensure_workers()
+        self._tracks.put({"id": job_id, "kind": "track", "link": link, "file_path": file_path, "title": title})
+        return job_id
+
+    def cancel(self, job_id):
+        self._control("cancel", job_id)
+
+    def pause(self, job_id):
+        self._control("pause", job_id)
+
+    def resume(self, job_id):
+        self._control("resume", job_id)
+
+    def cancel_playlist(self, name):
+        for job_id in self.jobs_for(name):
+            self.cancel(job_id)
+
+    def pause_playlist(self, name):
+        for job_id in self.jobs_for(name):
+            self.pause(job_id)
+
+    def resume_playlist(self, name):
+        for job_id in self.jobs_for(name):
+            self.resume(job_id)
+
+    def jobs_for(self, name):
+        with self._lock:
+            return [job_id for job_id, job in self._pending.items() if job["name"] == name and not job["done"].is_set()]
+
+    def _control(self, action, job_id):
+        with self._lock:
+            job = self._pending.get(job_id)
+            if job is None or job["done"].is_set() or job["state"] == "cancelled":
+                return
+            job["state"] = {"cancel": "cancelled", "pause": "paused", "resume": "running"}[action]
+            if job["pid"] is None:
+                # still queued: a cancelled job is released right away, the worker
+                # is told about the final state once it picks the job up
+                if action == "cancel":
+                    job["error"] = "Cancelled"
+                    job["done"].set()
+                    self._cancelled[job_id] = True
+                return
+            controls = self._workers.get(job["pid"], (None, None))[1]
+        if controls is not None:
+            controls.put((action, job_id))
+
+    def set_track_listener(self, key, callback):
+        # keyed so a view that is rebuilt replaces its old callback instead of stacking them
+        if callback is None:
+            self._track_listeners.pop(key, None)
+        else:
+            self._track_listeners[key] = callback
+
+    def wait(self, job_id, timeout=None):
+        with self._lock:
+            job = self._pending.get(job_id)
+            if job is None:
+                return self._results.pop(job_id, None)
+        job["done"].wait(timeout)
+        with self._lock:
+            self._results.pop(job_id, None)
+        return job["error"]
+
+    def _ensure_workers(self):
+        if self._cancelled is None:
+            manager = self._ctx.Manager()
+            self._cancelled = manager.dict()
+            self._taken = manager.dict()
+        self._workers = {pid: worker for pid, worker in self._workers.items() if worker[0].is_alive()}
+        lanes = [worker[2] for worker in self._workers.values()]
+        needed = [self._jobs] * (self.processes - lanes.count(self._jobs))
+        if not lanes.count(self._tracks) and any(job.get("on_done") and not job["done"].is_set() for job in self._pending.values()):
+            needed.append(self._tracks)
+        for jobs in needed:
+            controls = self._ctx.Queue()
+            proc = self._ctx.Process(target=_worker_main, args=(jobs, self._events, controls, self._cancelled, self._taken, self.processes), daemon=True)
+            proc.start()
+            self._workers[proc.pid] = (proc, controls, jobs)
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        last_reap = time.monotonic()
+        while True:
+            try:
+                event = self._events.get(timeout=1)
+                self._apply(event)
+            except queue.Empty:
+                pass
+            except Exception as e:
+                print(f"Download event error: {e}")
+            if time.monotonic() - last_reap >= 1:
+                last_reap = time.monotonic()
+                self._reap()
+
+    def _apply(self, event):
+        kind, job_id = event[0], event[1]
+        if kind == "added":
+            for callback in list(self._track_listeners.values()):
+                try:
+                    callback(event[2], event[3])
+                except Exception as e:
+                    print(f"Track listener error: {e}")
+            # the worker's own publish stays in its process; repeat it on this side's bus
+            events.publish(events.TRACK_ADDED, event[2], event[3])
+        job = self._pending.get(job_id)
+        if job is None:
+            return
+        progress = job["progress"]
+        if kind == "started":
+            with self._lock:
+                job["pid"] = event[2]
+                # picked up before the worker could see a queued cancel; the control message below handles it
+                self._cancelled.pop(job_id, None)
+                state = job["state"]
+                controls = self._workers.get(job["pid"], (None, None))[1]
+            if state != "running" and controls is not None:
+                controls.put(({"cancelled": "cancel", "paused": "pause"}[state], job_id))
+        elif kind == "report":
+            progress.report(event[2], event[3], event[4])
+        elif kind == "complete":
+            progress.complete(event[2])
+        elif kind == "total":
+            progress.set_total(event[2])
+        elif kind == "message":
+            progress.set_message(event[2], event[3])
+        elif kind == "fetched":
+            job["new_path"] = event[3]
+            if event[3]:
+                # restore_file published in the worker; repeat it on this side's bus
+                events.publish(events.TRACK_MOVED, DbService.get_playlist_name_of(event[3]), event[2], event[3])
+        elif kind == "done":
+            with self._lock:
+                self._pending.pop(job_id, None)
+                self._taken.pop(job_id, None)
+                if not job["done"].is_set():
+                    job["error"] = event[2]
+                    job["done"].set()
+                    self._results[job_id] = job["error"]
+            self._finish_track(job)
+            schedule_quota_check()
+
+    def _finish_track(self, job):
+        # a track job reports its path exactly once, whether it finished or its worker died
+        on_done = job.pop("on_done", None)
+        if on_done is not None:
+            try:
+                on_done(job.get("new_path"))
+            except Exception as e:
+                print(f"Track job callback error: {e}")
+
+    def _reap(self):
+        # apply whatever a dead worker managed to send before judging its jobs
+        while True:
+            try:
+                self._apply(self._events.get_nowait())
+            except queue.Empty:
+                break
+        with self._lock:
+            dead_pids = {pid for pid, worker in self._workers.items() if not worker[0].is_alive()}
+            if not dead_pids:
+                return
+            failed = []
+            taken = dict(self._taken)
+            for job_id, job in list(self._pending.items()):
+                # taken counts too: the worker may have died before its "started" event got out
+                if job["pid"] in dead_pids or taken.get(job_id) in dead_pids:
+                    self._taken.pop(job_id, None)
+                    del self._pending[job_id]
+                    if not job["done"].is_set():
+                        job["error"] = "Download worker stopped unexpectedly."
+                        job["done"].set()
+                    self._results[job_id] = job["error"]
+                    failed.append(job)
+            if any(not job["done"].is_set() for job in self._pending.values()):
+                self._ensure_workers()
+            else:
+                self._workers = {pid: worker for pid, worker in self._workers.items() if pid not in dead_pids}
+        for job in failed:
+            self._finish_track(job)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_download_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            try:
+                processes = int(DbService.get_setting("download_processes", "1"))
+            except ValueError:
+                processes = 1
+            _client = DownloadClient(processes)
+        return _client
+
+def download_playlist(playlist_link, playlist_name, page, progress_text, progress_bar, is_batch=False):
+    progress = ProgressAggregator(progress_text, progress_bar, DbService.get_progress_fps()).start()
+    client = get_download_client()
+    error = client.wait(client.submit(playlist_link, playlist_name, progress))
+    if error:
+        progress.set_message(f"A critical download error occurred: {error}", 1.0)
+        print(f"Download error: {error}")
+    progress.stop()
@@ -0,0 +1,59 @@
+import threading
+
+# In-process bus for library changes. DbService publishes after every mutation;
+# every publish bumps the version of the playlist it touches, so caches keyed
+# by version(name) go stale exactly when that playlist changed.
+TRACK_ADDED = "track_added"
+TRACK_REMOVED = "track_removed"
+TRACK_RENAMED = "track_renamed"
+TRACK_REORDERED = "track_reordered"
+TRACK_MOVED = "track_moved"
+FAVOURITE_TOGGLED = "favourite_toggled"
+PLAYLIST_CHANGED = "playlist_changed"
+
+FAVOURITES = "Favourites"
+
+class Event:
+    __slots__ = ['kind', 'playlist', 'file_path', 'new_path']
+    def __init__(self, kind, playlist=None, file_path=None, new_path=None):
+        self.kind = kind
+        # None means any playlist may have changed (maintenance jobs, bulk moves)
+        self.playlist = playlist
+        self.file_path = file_path
+        # TRACK_MOVED only: where file_path's row points now
+        self.new_path = new_path
+
+_lock = threading.Lock()
+_versions = {}
+_global_version = 0
+_subscribers = {}
+
+def version(playlist):
+    with _lock:
+        return _global_version, _versions.get(playlist, 0)
+
+def subscribe(key, callback):
+    # keyed like DownloadClient.set_track_listener, so a rebuilt view replaces its old subscription
+    with _lock:
+        if callback is None:
+            _subscribers.pop(key, None)
+        else:
+            _subscribers[key] = callback
+
+def publish(kind, playlist=None, file_path=None, new_path=None):
+    global _global_version
+    event = Event(kind, playlist, file_path, new_path)
+    with _lock:
+        if playlist is None:
+            _global_version += 1
+        else:
+            _versions[playlist] = _versions.get(playlist, 0) + 1
+        if kind == FAVOURITE_TOGGLED and playlist != FAVOURITES:
+            _versions[FAVOURITES] = _versions.get(FAVOURITES, 0) + 1
+        callbacks = list(_subscribers.values())
+    for callback in callbacks:
+        try:
+            callback(event)
+        except Exception as e:
+            print(f"Event subscriber error: {e}")
+    return event
@@ -0,0 +1,84 @@
+import os, threading
+import numpy as np
+from .db import DbService
+from .utils import BASE_DIR
+
+# one float32 row per analysed track, appended in analysis order; files.feature_row points into it
+FEATURE_DIM = 32
+FEATURES_FILE = os.path.join(BASE_DIR, "features.f32")
+ROW_BYTES = FEATURE_DIM * 4
+
+_lock = threading.Lock()
+_index = None
+
+def append_features(vectors):
+    """Appends vectors to the feature file and returns their row numbers."""
+    if not vectors:
+        return []
+    with _lock:
+        size = os.path.getsize(FEATURES_FILE) if os.path.exists(FEATURES_FILE) else 0
+        if size % ROW_BYTES:
+            # a write that was cut short: drop the partial row
+            size -= size % ROW_BYTES
+            os.truncate(FEATURES_FILE, size)
+        with open(FEATURES_FILE, "ab") as f:
+            f.write(np.stack(vectors).astype(np.float32).tobytes())
+    first = size // ROW_BYTES
+    return list(range(first, first + len(vectors)))
+
+class FeatureIndex:
+    """
+    Brute-force cosine nearest neighbours over standardised feature vectors.
+    A 50k-track library is a 50k x 32 float32 matrix (6 MB), so one query is
+    a single matrix-vector product plus argpartition: a few milliseconds.
+    """
+    __slots__ = ['ids', 'matrix', 'position', 'file_size']
+    def __init__(self, ids, matrix, file_size):
+        self.ids = ids
+        self.matrix = matrix
+        self.position = {song_id: i for i, song_id in enumerate(ids.tolist())}
+        self.file_size = file_size
+
+    @classmethod
+    def load(cls):
+        file_size = os.path.getsize(FEATURES_FILE) if os.path.exists(FEATURES_FILE) else 0
+        count = file_size // ROW_BYTES
+        rows = [(song_id, row) for song_id, row in DbService.get_feature_rows() if row < count]
+        if not rows:
+            return cls(np.empty(0, dtype=np.int64), np.empty((0, FEATURE_DIM), dtype=np.float32), file_size)
+        data = np.memmap(FEATURES_FILE, dtype=np.float32, mode="r", shape=(count, FEATURE_DIM))
+        ids = np.array([song_id for song_id, _ in rows], dtype=np.int64)
+        matrix = np.array(data[[row for _, row in rows]], dtype=np.float32)
+        del data
+        # z-score every dimension so no single feature dominates, then unit length for cosine similarity
+        matrix -= matrix.mean(axis=0)
+        matrix /= matrix.std(axis=0) + 1e-6
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-6
+        return cls(ids, matrix, file_size)
+
+    def nearest(self, song_id, k=50):
+        i = self.position.get(song_id)
+        if i is None or len(self.ids) < 2:
+            return []
+        scores = self.matrix @ self.matrix[i]
+        scores[i] = -np.inf
+        k = min(k, len(self.ids) - 1)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return self.ids[top].tolist()
+
+def get_index():
+    global _index
+    file_size = os.path.getsize(FEATURES_FILE) if os.path.exists(FEATURES_FILE) else 0
+    with _lock:
+        # the file only grows, so its size tells whether new tracks were analysed
+        if _index is None or _index.file_size != file_size:
+            _index = FeatureIndex.load()
+        return _index
+
+def build_radio(song_id, k=50):
+    """The seed track followed by its k most similar tracks from any playlist, or [] if it has no features yet."""
+    index = get_index()
+    if song_id not in index.position:
+        return []
+    return DbService.get_songs_by_ids([song_id] + index.nearest(song_id, k))
@@ -0,0 +1,132 @@
+import os, hashlib
+from concurrent.futures import ProcessPoolExecutor
+from .db import DbService
+from .utils import AUDIO_EXTENSIONS, THUMBNAIL_DIR
+from .media import probe_file, extract_cover
+
+BATCH_SIZE = 500
+
+def scan_folder(root):
+    """Yields (folder, [(path, size, mtime), ...]) for every folder under root that holds audio."""
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        files = []
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in AUDIO_EXTENSIONS:
+                        stat = entry.stat()
+                        files.append((os.path.abspath(entry.path), stat.st_size, stat.st_mtime))
+        except OSError as e:
+            print(f"Could not scan {folder}: {e}")
+            continue
+        if files:
+            files.sort()
+            yield folder, files
+
+def playlist_name_for(root, folder, taken=()):
+    """
+    The playlist a folder imports into: the one already linked to it, otherwise
+    its path below root's parent, suffixed until neither an existing playlist
+    nor one in `taken` has that name.
+    """
+    name = DbService.get_playlist_name_by_link(folder)
+    if name:
+        return name
+    base = name = os.path.relpath(folder, os.path.dirname(root)).replace(os.sep, "/")
+    suffix = 2
+    while name in taken or DbService.get_playlist_info(name):
+        name = f"{base} ({suffix})"
+        suffix += 1
+    return name
+
+def _probe_for_import(path):
+    # runs in the process pool: ffprobe plus cover extraction, nothing that touches the DB
+    try:
+        info = probe_file(path)
+    except Exception as e:
+        print(f"Could not probe {path}: {e}")
+        return None
+    if info is None:
+        return None
+    thumbnail_path = None
+    if info["has_art"]:
+        name = hashlib.sha1(path.encode("utf-8", "ignore")).hexdigest()[:16]
+        target = os.path.join(THUMBNAIL_DIR, f"{name}.jpg")
+        try:
+            thumbnail_path = target if os.path.exists(target) else extract_cover(path, target)
+        except Exception:
+            thumbnail_path = None
+    info["thumbnail_path"] = thumbnail_path
+    return info
+
+def import_folder(root, progress, on_playlist=None):
+    """
+    Imports every audio file under `root`, one playlist per folder. Files already
+    imported with the same size and mtime are skipped, everything else is probed
+    in a process pool and written with batched inserts.
+    Returns (imported, skipped, failed).
+    """
+    root = os.path.abspath(root)
+    known = DbService.get_file_stats_under(root)
+    pending = []
+    skipped = 0
+    names = set()
+    for folder, files in scan_folder(root):
+        name = playlist_name_for(root, folder, names)
+        names.add(name)
+        for path, size, mtime in files:
+            if known.get(path) == (size, mtime):
+                skipped += 1
+            else:
+                pending.append((name, folder, path, size, mtime))
+
+    progress.set_total(len(pending))
+    if not pending:
+        progress.set_message(f"Nothing new to import ({skipped} unchanged).", 1.0)
+        return 0, skipped, 0
+
+    imported = failed = 0
+    batches = {}
+    folders = {}
+    def flush(name):
+        nonlocal imported
+        songs = batches.pop(name, [])
+        if songs:
+            if not DbService.get_playlist_name_by_link(folders[name]):
+                DbService.add_playlist(name, folders[name])
+            imported += DbService.add_files(name, songs)
+            if on_playlist:
+                on_playlist(name)
+
+    workers = DbService.get_performance_workers()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_probe_for_import, [item[2] for item in pending], chunksize=16)
+        for (name, folder, path, size, mtime), info in zip(pending, results):
+            if info is None:
+                failed += 1
+            else:
+                folders[name] = folder
+                title = info["title"] or os.path.splitext(os.path.basename(path))[0]
+                duration = info["duration"]
+                batches.setdefault(name, []).append({
+                    "title": title,
+                    "original_title": title,
+                    "file_path": path,
+                    "duration": int(round(duration)) if duration else None,
+                    "thumbnail_path": info["thumbnail_path"],
+                    "link": None,
+                    "size": size,
+                    "mtime": mtime,
+                })
+                if len(batches[name]) >= BATCH_SIZE:
+                    flush(name)
+            progress.complete(path)
+    for name in list(batches):
+        flush(name)
+
+    progress.set_message(f"Imported {imported} tracks ({skipped} unchanged, {failed} failed).", 1.0)
+    return imported, skipped, failed
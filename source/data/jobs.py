@@ -0,0 +1,70 @@
+import threading, time
+
+class JobCancelled(Exception):
+    pass
+
+class JobControl:
+    """
+    Cooperative pause/cancel switch for one download job. Download threads call
+    `checkpoint()` from their progress hooks: it blocks while the job is paused
+    and returns True once the job has been cancelled.
+    """
+    __slots__ = ['cancelled', '_running']
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    def cancel(self):
+        self.cancelled.set()
+        self._running.set()
+
+    def pause(self):
+        if not self.cancelled.is_set():
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def checkpoint(self):
+        self._running.wait()
+        return self.cancelled.is_set()
+
+class BandwidthLimiter:
+    """
+    Token bucket shared by every download in a process. Each caller pays for the
+    bytes it just received and sleeps off any debt, so concurrent downloads
+    split the limit between them instead of racing for it.
+    """
+    __slots__ = ['rate', '_allowance', '_last', '_lock']
+    def __init__(self, rate=0):
+        self.rate = 0
+        self._allowance = 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        with self._lock:
+            self.rate = max(0, rate)
+            self._allowance = float(self.rate)
+            self._last = time.monotonic()
+
+    def consume(self, amount, cancelled=None):
+        if self.rate <= 0 or amount <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+            self._last = now
+            self._allowance -= amount
+            delay = -self._allowance / self.rate if self._allowance < 0 else 0
+        if delay > 0:
+            if cancelled is not None:
+                cancelled.wait(delay)
+            else:
+                time.sleep(delay)
@@ -0,0 +1,220 @@
+import os, json, subprocess, sys
+from concurrent.futures import ThreadPoolExecutor
+from .jobs import JobCancelled
+
+FFMPEG = "ffmpeg"
+FFPROBE = "ffprobe"
+
+# Containers that can be kept as-is in "native" mode, and the container any
+# other source is remuxed into with a plain stream copy.
+NATIVE_EXTENSIONS = ('.m4a', '.mp3', '.opus', '.ogg', '.aac', '.flac', '.wav')
+REMUX_EXTENSIONS = {'.webm': '.ogg', '.weba': '.ogg', '.mp4': '.m4a'}
+
+def _creation_flags():
+    return subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+
+def run_ffmpeg(args, cancelled=None):
+    proc = subprocess.Popen([FFMPEG, "-y", "-v", "error", *args], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            creationflags=_creation_flags())
+    while True:
+        try:
+            _, stderr = proc.communicate(timeout=0.25)
+            break
+        except subprocess.TimeoutExpired:
+            if cancelled is not None and cancelled.is_set():
+                proc.kill()
+                proc.communicate()
+                raise JobCancelled("ffmpeg cancelled")
+    if proc.returncode != 0:
+        error = stderr.decode(errors="ignore").strip()
+        raise RuntimeError(error or f"ffmpeg exited with code {proc.returncode}")
+
+def temp_path(target):
+    stem, ext = os.path.splitext(target)
+    return f"{stem}.tmp{ext}"
+
+def _run_ffmpeg_to(target, args, cancelled=None):
+    # ffmpeg writes to a temp name that is renamed into place only once it has
+    # succeeded, so a crash never leaves a truncated file under the final name
+    temp = temp_path(target)
+    try:
+        run_ffmpeg([*args, temp], cancelled)
+        os.replace(temp, target)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+
+# the tags yt-dlp's FFmpegMetadata wrote, as (tag, info fields tried in order)
+METADATA_FIELDS = (
+    ("title", ("track", "title")),
+    ("artist", ("artist", "creator", "uploader", "uploader_id")),
+    ("album", ("album",)),
+    ("date", ("upload_date",)),
+    ("description", ("description",)),
+    ("comment", ("webpage_url",)),
+)
+
+def metadata_from_info(info):
+    info = info or {}
+    tags = {}
+    for tag, fields in METADATA_FIELDS:
+        value = next((info[field] for field in fields if info.get(field)), None)
+        if value is not None:
+            tags[tag] = str(value)
+    return tags
+
+def postprocess_audio(source_path, target_stem, mode, title=None, cancelled=None, tags=None):
+    ext = os.path.splitext(source_path)[1].lower()
+    tags = dict(tags or {})
+    if title:
+        tags["title"] = title
+    metadata = [arg for tag, value in tags.items() for arg in ("-metadata", f"{tag}={value}")]
+    if mode == "native":
+        if ext in NATIVE_EXTENSIONS:
+            target = target_stem + ext
+            os.replace(source_path, target)
+            return target
+        target = target_stem + REMUX_EXTENSIONS.get(ext, '.ogg')
+        _run_ffmpeg_to(target, ["-i", source_path, "-vn", "-c:a", "copy", *metadata], cancelled)
+    else:
+        target = target_stem + ".mp3"
+        _run_ffmpeg_to(target, ["-i", source_path, "-vn", "-c:a", "libmp3lame", "-b:a", "192k", "-id3v2_version", "3", *metadata], cancelled)
+    try:
+        os.remove(source_path)
+    except OSError:
+        pass
+    return target
+
+def decode_pcm(path, sample_rate=22050):
+    """Decodes the first audio stream to mono 32-bit float PCM, returned as raw bytes."""
+    result = subprocess.run(
+        [FFMPEG, "-v", "error", "-i", path, "-map", "0:a:0", "-ac", "1", "-ar", str(sample_rate), "-f", "f32le", "pipe:1"],
+        capture_output=True, creationflags=_creation_flags()
+    )
+    if result.returncode != 0:
+        error = result.stderr.decode(errors="ignore").strip()
+        raise RuntimeError(error or f"ffmpeg exited with code {result.returncode}")
+    return result.stdout
+
+def encode_opus(source_path, target_stem, bitrate_kbps=96):
+    target = target_stem + ".opus"
+    _run_ffmpeg_to(target, ["-i", source_path, "-map", "0:a:0", "-c:a", "libopus", "-b:a", f"{bitrate_kbps}k",
+                            "-vbr", "on", "-map_metadata", "0"])
+    return target
+
+def lower_process_priority():
+    # process pool initializer: background encodes must not compete with playback
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            BELOW_NORMAL_PRIORITY_CLASS = 0x4000
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), BELOW_NORMAL_PRIORITY_CLASS)
+        else:
+            os.nice(10)
+    except Exception as e:
+        print(f"Could not lower worker priority: {e}")
+
+def usable_chapters(chapters, duration=None):
+    """Returns (start, end, title) for every chapter worth its own track, or [] if the video should stay whole."""
+    result = []
+    for number, chapter in enumerate(chapters or [], start=1):
+        start = float(chapter.get("start_time") or 0)
+        end = chapter.get("end_time")
+        end = float(end) if end is not None else duration
+        if end is None or end - start < 1:
+            continue
+        result.append((start, end, chapter.get("title") or f"Chapter {number}"))
+    return result if len(result) > 1 else []
+
+def split_chapters(source_path, target_stem, chapters, workers=2, cancelled=None):
+    """
+    Cuts `source_path` into one file per chapter with a stream copy, so splitting
+    an album costs a few seconds of I/O instead of a transcode per chapter.
+    Returns [{"file_path", "title", "duration"}] in chapter order; on any failure
+    the chapters written so far are removed and the whole file is left alone.
+    """
+    ext = os.path.splitext(source_path)[1]
+    def cut(job):
+        number, (start, end, title) = job
+        target = f"{target_stem}.c{number:02d}{ext}"
+        _run_ffmpeg_to(target, [
+            "-ss", f"{start:.3f}", "-i", source_path, "-t", f"{end - start:.3f}",
+            "-map", "0:a", "-c", "copy", "-metadata", f"title={title}", "-metadata", f"track={number}"
+        ], cancelled)
+        return {"file_path": os.path.abspath(target), "title": title, "duration": int(round(end - start))}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(cut, job) for job in enumerate(chapters, start=1)]
+    tracks, errors = [], []
+    for future in futures:
+        try:
+            tracks.append(future.result())
+        except Exception as e:
+            errors.append(e)
+    if errors:
+        for track in tracks:
+            try:
+                os.remove(track["file_path"])
+            except OSError:
+                pass
+        raise errors[0]
+    try:
+        os.remove(source_path)
+    except OSError:
+        pass
+    return tracks
+
+def probe_file(path):
+    result = subprocess.run(
+        [FFPROBE, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+        capture_output=True, creationflags=_creation_flags()
+    )
+    if result.returncode != 0:
+        return None
+    try:
+        data = json.loads(result.stdout or b"{}")
+    except ValueError:
+        return None
+    streams = data.get("streams") or []
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    if audio is None:
+        return None
+    fmt = data.get("format") or {}
+    tags = {key.lower(): value for key, value in (fmt.get("tags") or {}).items()}
+    try:
+        duration = float(fmt.get("duration") or audio.get("duration"))
+    except (TypeError, ValueError):
+        duration = None
+    return {
+        "duration": duration,
+        "title": tags.get("title"),
+        "artist": tags.get("artist"),
+        "codec": audio.get("codec_name"),
+        "has_art": any(s.get("codec_type") == "video" and (s.get("disposition") or {}).get("attached_pic") for s in streams),
+    }
+
+def verify_audio(path, size=None, duration=None):
+    """
+    Cheap integrity check: the file must exist with the recorded size, and
+    ffprobe must read its header and a duration close to the recorded one.
+    Returns the probe info, or None if the file is missing or broken.
+    """
+    try:
+        actual_size = os.path.getsize(path)
+    except OSError:
+        return None
+    if actual_size == 0 or (size and actual_size != size):
+        return None
+    info = probe_file(path)
+    if info is None or not info["duration"]:
+        return None
+    if duration and abs(info["duration"] - duration) > max(2, duration * 0.05):
+        return None
+    return info
+
+def extract_cover(path, target):
+    _run_ffmpeg_to(target, ["-i", path, "-an", "-map", "0:v:0", "-frames:v", "1"])
+    return target
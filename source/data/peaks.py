@@ -0,0 +1,49 @@
+import os, threading
+import numpy as np
+from .utils import BASE_DIR
+
+# one row of PEAK_BUCKETS (min, max) int8 pairs per track, appended in analysis order; files.peaks_row points into it
+PEAK_BUCKETS = 512
+PEAKS_FILE = os.path.join(BASE_DIR, "peaks.i8")
+ROW_BYTES = PEAK_BUCKETS * 2
+
+_lock = threading.Lock()
+_map = None
+
+def compute_peaks(samples):
+    """Min and max of each of PEAK_BUCKETS equal slices of the track, scaled to int8, as a (PEAK_BUCKETS, 2) array."""
+    if len(samples) < PEAK_BUCKETS:
+        return None
+    count = len(samples) // PEAK_BUCKETS
+    buckets = samples[:count * PEAK_BUCKETS].reshape(PEAK_BUCKETS, count)
+    peaks = np.stack([buckets.min(axis=1), buckets.max(axis=1)], axis=1)
+    return np.clip(np.round(peaks * 127), -127, 127).astype(np.int8)
+
+def append_peaks(peaks):
+    """Appends peak rows to the peaks file and returns their row numbers."""
+    if not peaks:
+        return []
+    with _lock:
+        size = os.path.getsize(PEAKS_FILE) if os.path.exists(PEAKS_FILE) else 0
+        if size % ROW_BYTES:
+            # a write that was cut short: drop the partial row
+            size -= size % ROW_BYTES
+            os.truncate(PEAKS_FILE, size)
+        with open(PEAKS_FILE, "ab") as f:
+            f.write(np.stack(peaks).astype(np.int8).tobytes())
+    first = size // ROW_BYTES
+    return list(range(first, first + len(peaks)))
+
+def read_peaks(row):
+    """The (PEAK_BUCKETS, 2) peaks of a row as a view into the memory-mapped file, or None."""
+    global _map
+    if row is None:
+        return None
+    size = os.path.getsize(PEAKS_FILE) if os.path.exists(PEAKS_FILE) else 0
+    if row >= size // ROW_BYTES:
+        return None
+    with _lock:
+        # the file only grows, so remap only when rows were appended since
+        if _map is None or len(_map) != size // ROW_BYTES:
+            _map = np.memmap(PEAKS_FILE, dtype=np.int8, mode="r", shape=(size // ROW_BYTES, PEAK_BUCKETS, 2))
+        return _map[row]
@@ -0,0 +1,132 @@
+import queue, threading, time
+
+_CLOSE = object()
+
+class Stage:
+    """
+    One step of a pipeline: a pool of worker threads pulling from a bounded queue.
+    A full queue blocks the previous stage, so a slow stage applies backpressure
+    instead of letting work pile up in memory.
+    """
+    __slots__ = ['name', 'handler', 'workers', 'inbox', 'next_stage', 'on_error', 'processed', 'failed',
+                 'busy_seconds', 'peak_depth', 'started_at', '_threads', '_lock']
+    def __init__(self, name, handler, workers=1, maxsize=8):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.inbox = queue.Queue(maxsize=maxsize)
+        self.next_stage = None
+        self.on_error = None
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.peak_depth = 0
+        self.started_at = None
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, item):
+        self.inbox.put(item)
+        depth = self.inbox.qsize()
+        if depth > self.peak_depth:
+            self.peak_depth = depth
+
+    def close(self):
+        for _ in self._threads:
+            self.inbox.put(_CLOSE)
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        while True:
+            item = self.inbox.get()
+            if item is _CLOSE:
+                break
+            started = time.perf_counter()
+            try:
+                result = self.handler(item)
+                failed = False
+            except Exception as e:
+                print(f"Pipeline stage '{self.name}' failed: {e}")
+                result = None
+                failed = True
+                if self.on_error is not None:
+                    try:
+                        self.on_error(item, e)
+                    except Exception:
+                        pass
+            with self._lock:
+                self.busy_seconds += time.perf_counter() - started
+                self.processed += 1
+                self.failed += failed
+            if result is not None and self.next_stage is not None:
+                self.next_stage.put(result)
+
+    def metrics(self):
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0
+        with self._lock:
+            return {
+                "stage": self.name,
+                "workers": self.workers,
+                "processed": self.processed,
+                "failed": self.failed,
+                "queued": self.inbox.qsize(),
+                "peak_queued": self.peak_depth,
+                "per_second": self.processed / elapsed if elapsed > 0 else 0.0,
+                "utilization": self.busy_seconds / (elapsed * self.workers) if elapsed > 0 else 0.0,
+            }
+
+class Pipeline:
+    """
+    Chains stages so each item flows through them in order while every stage
+    works on different items at the same time. Handlers return the item to pass
+    on, or None to drop it; `on_error` is called with any item a stage fails on.
+    """
+    __slots__ = ['stages', 'report_interval', '_stop', '_reporter']
+    def __init__(self, stages, on_error=None, report_interval=5):
+        self.stages = stages
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next_stage = next_stage
+        for stage in stages:
+            stage.on_error = on_error
+        self.report_interval = report_interval
+        self._stop = threading.Event()
+        self._reporter = None
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        if self.report_interval:
+            self._reporter = threading.Thread(target=self._report, daemon=True)
+            self._reporter.start()
+        return self
+
+    def submit(self, item):
+        self.stages[0].put(item)
+
+    def close(self):
+        for stage in self.stages:
+            stage.close()
+        self._stop.set()
+        self.log_metrics()
+
+    def metrics(self):
+        return [stage.metrics() for stage in self.stages]
+
+    def log_metrics(self):
+        print("Pipeline: " + " | ".join(
+            f"{m['stage']} x{m['workers']}: {m['processed']} done, {m['failed']} failed, "
+            f"{m['queued']} queued (peak {m['peak_queued']}), {m['per_second']:.2f}/s, {m['utilization'] * 100:.0f}% busy"
+            for m in self.metrics()
+        ))
+
+    def _report(self):
+        while not self._stop.wait(self.report_interval):
+            self.log_metrics()
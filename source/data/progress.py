@@ -0,0 +1,203 @@
+import threading, time
+
+STATUS_LABELS = {
+    "starting": "Starting Download",
+    "downloading": "Downloading",
+    "finished": "Completed",
+    "processing": "Processing",
+    "error": "Failed"
+}
+
+RELAYED_FIELDS = ("status", "downloaded_bytes", "downloaded_bytes_temp", "total_bytes", "total_bytes_estimate")
+
+class ProgressAggregator:
+    """
+    Collects yt-dlp progress events from every running download into shared
+    counters and publishes them to the progress controls at a fixed frame rate.
+
+    Hooks only touch the counters, so however often yt-dlp fires them the UI
+    sees at most `fps` updates per second, and only the progress text and bar
+    are sent to the client instead of a full page diff.
+    """
+    __slots__ = ['progress_text', 'progress_bar', 'interval', 'total', 'completed',
+                 'events', 'published', '_items', '_order', '_message', '_dirty', '_lock', '_stop', '_thread']
+    def __init__(self, progress_text, progress_bar, fps=10):
+        self.progress_text = progress_text
+        self.progress_bar = progress_bar
+        self.interval = 1 / max(1, fps)
+        self.total = 0
+        self.completed = 0
+        self.events = 0
+        self.published = 0
+        self._items = {}
+        self._order = 0
+        self._message = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._publish()
+        saved = max(0, self.events - self.published)
+        print(f"Progress: {self.events} events, {self.published} UI updates ({saved} saved)")
+
+    def set_total(self, total):
+        with self._lock:
+            self.total = total
+            self._dirty = True
+
+    def set_message(self, text, value=None):
+        with self._lock:
+            self._message = (text, value)
+            self.events += 1
+            self._dirty = True
+
+    def hook(self, key, title):
+        def progress_hook(status):
+            self.report(key, title, status)
+        return progress_hook
+
+    def report(self, key, title, status):
+        st = status.get("status")
+        if st not in STATUS_LABELS:
+            return
+        downloaded = status.get("downloaded_bytes") or status.get("downloaded_bytes_temp") or 0
+        total = status.get("total_bytes") or status.get("total_bytes_estimate") or 0
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                item = self._items[key] = {"title": title, "fraction": 0.0, "status": st, "order": 0}
+            item["status"] = st
+            if st == "finished":
+                item["fraction"] = 1.0
+            elif total > 0:
+                item["fraction"] = min(1.0, downloaded / total)
+            self._order += 1
+            item["order"] = self._order
+            self._message = None
+            self.events += 1
+            self._dirty = True
+
+    def track_added(self, playlist_name, file_path):
+        pass
+
+    def complete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+            self.completed += 1
+            self._message = None
+            self.events += 1
+            self._dirty = True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._publish()
+
+    def _snapshot(self):
+        with self._lock:
+            if not self._dirty:
+                return None
+            self._dirty = False
+            if self._message is not None:
+                return self._message
+            total = self.total
+            active = list(self._items.values())
+            partial = sum(item["fraction"] for item in active)
+            value = (self.completed + partial) / total if total > 0 else 0
+            done = min(total, self.completed + 1)
+            if not active:
+                return f"Finished ({self.completed}/{total})", value
+            latest = max(active, key=lambda item: item["order"])
+            label = STATUS_LABELS.get(latest["status"], latest["status"])
+            if len(active) > 1:
+                return f"{label} {len(active)} tracks ({done}/{total}) - {value * 100:.1f}%", value
+            return f"{label} ({done}/{total}): {latest['title']} - {latest['fraction'] * 100:.1f}%", value
+
+    def _publish(self):
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return
+        text, value = snapshot
+        self.progress_text.value = text
+        if value is not None:
+            self.progress_bar.value = value
+        try:
+            self.progress_text.update()
+            self.progress_bar.update()
+        except Exception:
+            pass
+        self.published += 1
+
+class ProgressRelay:
+    """
+    Same interface as ProgressAggregator, used inside the download worker
+    process. Calls are forwarded to the UI process through `emit`, and repeated
+    byte counts for the same track are throttled to `interval` seconds.
+    """
+    __slots__ = ['emit', 'job_id', 'interval', '_last']
+    def __init__(self, emit, job_id, interval=0.1):
+        self.emit = emit
+        self.job_id = job_id
+        self.interval = interval
+        self._last = {}
+
+    def hook(self, key, title):
+        def progress_hook(status):
+            self.report(key, title, status)
+        return progress_hook
+
+    def report(self, key, title, status):
+        st = status.get("status")
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None and last[0] == st and now - last[1] < self.interval:
+            return
+        self._last[key] = (st, now)
+        self.emit(("report", self.job_id, key, title, {field: status.get(field) for field in RELAYED_FIELDS}))
+
+    def complete(self, key):
+        self._last.pop(key, None)
+        self.emit(("complete", self.job_id, key))
+
+    def track_added(self, playlist_name, file_path):
+        self.emit(("added", self.job_id, playlist_name, file_path))
+
+    def set_total(self, total):
+        self.emit(("total", self.job_id, total))
+
+    def set_message(self, text, value=None):
+        self.emit(("message", self.job_id, text, value))
+
+class QuietProgress:
+    """Progress sink for background jobs that have no progress controls."""
+    __slots__ = ['name']
+    def __init__(self, name):
+        self.name = name
+
+    def hook(self, key, title):
+        return lambda status: None
+
+    def report(self, key, title, status):
+        pass
+
+    def complete(self, key):
+        pass
+
+    def track_added(self, playlist_name, file_path):
+        pass
+
+    def set_total(self, total):
+        pass
+
+    def set_message(self, text, value=None):
+        print(f"{self.name}: {text}")
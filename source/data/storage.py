@@ -0,0 +1,97 @@
+import os, re, threading
+from . import activity
+from .db import DbService, remove_managed_file
+from .utils import AUDIO_DIR, is_managed_path
+from .youtube import fetch_track
+
+# chapters are cut from one download and cannot be fetched back one by one
+CHAPTER_FILE = re.compile(r"\.c\d\d\.[^.]+$")
+
+_refetching = {}
+_refetch_lock = threading.Lock()
+# held while files are evicted; anything else deleting audio takes it too
+quota_lock = threading.Lock()
+
+def audio_dir_usage():
+    total = 0
+    try:
+        with os.scandir(AUDIO_DIR) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    total += entry.stat().st_size
+    except OSError as e:
+        print(f"Could not measure {AUDIO_DIR}: {e}")
+    return total
+
+def enforce_quota():
+    """
+    Deletes the least recently played audio until the audio folder fits the
+    storage quota. Only tracks that can be downloaded again are touched, never
+    favourites, pinned tracks or imported files; their rows and thumbnails stay
+    and are marked "cloud". Returns the number of evicted tracks.
+    """
+    quota = DbService.get_storage_quota()
+    if quota <= 0:
+        return 0
+    with quota_lock:
+        used = audio_dir_usage()
+        if used <= quota:
+            return 0
+        favourites = set(DbService.get_favourites())
+        # the playing track and the one preloaded after it are about to be read
+        in_use = {activity.now_playing(), activity.preloaded()}
+        evicted = 0
+        for path in DbService.get_eviction_candidates():
+            if used <= quota:
+                break
+            if path in favourites or path in in_use or not is_managed_path(path) or CHAPTER_FILE.search(path):
+                continue
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+            if remove_managed_file(path) or not os.path.exists(path):
+                DbService.set_cloud(path)
+                used -= size
+                evicted += 1
+        print(f"Storage quota: evicted {evicted} tracks, {used / 1048576:.0f} of {quota / 1048576:.0f} MB used")
+        return evicted
+
+def schedule_quota_check():
+    threading.Thread(target=enforce_quota, daemon=True).start()
+
+def request_refetch(song, on_ready):
+    """
+    Downloads an evicted track again ahead of everything else. `on_ready` is
+    called with the new file path, or None if the download failed; concurrent
+    requests for the same track share one download.
+    """
+    path = song["file_path"]
+    with _refetch_lock:
+        if path in _refetching:
+            _refetching[path].append(on_ready)
+            return
+        _refetching[path] = [on_ready]
+    # imported here: the download client imports this module
+    from .downloader import get_download_client
+    get_download_client().submit_track(song["link"], path, song.get("title"), lambda new_path: _refetched(path, new_path))
+
+def refetch_file(link, path, title=None):
+    """Runs in a download worker: fetches an evicted track again and points its row at the new file."""
+    try:
+        new_path = fetch_track(link, path, title)
+        stat = os.stat(new_path)
+        DbService.restore_file(path, new_path, stat.st_size, stat.st_mtime)
+        return new_path
+    except Exception as e:
+        print(f"Could not fetch {title} again: {e}")
+        return None
+
+def _refetched(path, new_path):
+    with _refetch_lock:
+        callbacks = _refetching.pop(path, [])
+    for callback in callbacks:
+        try:
+            callback(new_path)
+        except Exception as e:
+            print(f"Refetch callback error: {e}")
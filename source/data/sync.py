@@ -0,0 +1,95 @@
+import threading, time
+from urllib.parse import urlparse
+from . import activity
+from .db import DbService
+from .downloader import get_download_client
+from .progress import QuietProgress
+
+class HostRateLimiter:
+    __slots__ = ['min_interval', '_next', '_lock']
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host, stop_event):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                ready_at = self._next.get(host, 0.0)
+                if now >= ready_at:
+                    self._next[host] = now + self.min_interval
+                    return True
+            if stop_event.wait(ready_at - now):
+                return False
+
+class SyncScheduler:
+    """
+    Periodically re-downloads every playlist that has a web link so new uploads
+    show up without re-adding the playlist. Syncs wait for the UI to be idle,
+    run at most `max_concurrent` playlists at a time and space out requests to
+    the same host by `host_interval` seconds.
+    """
+    __slots__ = ['interval', 'max_concurrent', 'limiter', 'initial_delay', '_stop', '_thread']
+    def __init__(self, interval_minutes=60, max_concurrent=1, host_interval=30, initial_delay=60):
+        self.interval = interval_minutes * 60
+        self.max_concurrent = max(1, max_concurrent)
+        self.limiter = HostRateLimiter(host_interval)
+        self.initial_delay = initial_delay
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def from_settings():
+        def setting_int(key, default):
+            try:
+                return max(0, int(DbService.get_setting(key, str(default))))
+            except ValueError:
+                return default
+        return SyncScheduler(
+            setting_int("sync_interval_minutes", 60),
+            setting_int("sync_max_concurrent", 1),
+            setting_int("sync_host_interval_seconds", 30)
+        )
+
+    def start(self):
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        delay = self.initial_delay
+        while not self._stop.wait(delay):
+            started = time.monotonic()
+            self.sync_all()
+            delay = max(0, self.interval - (time.monotonic() - started))
+
+    def sync_all(self):
+        slots = threading.Semaphore(self.max_concurrent)
+        threads = []
+        for name, link in DbService.get_playlist_links():
+            host = urlparse(link).netloc.lower()
+            if not host:
+                continue
+            slots.acquire()
+            if not activity.wait_until_idle(self._stop) or not self.limiter.acquire(host, self._stop):
+                slots.release()
+                break
+            thread = threading.Thread(target=self._sync_one, args=(name, link, slots), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+
+    def _sync_one(self, name, link, slots):
+        try:
+            client = get_download_client()
+            error = client.wait(client.submit(link, name, QuietProgress(name)))
+            if error:
+                print(f"Sync of '{name}' failed: {error}")
+        finally:
+            slots.release()
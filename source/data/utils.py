@@ -1,4 +1,4 @@
-import os,time
+import os,time,glob,threading
 import flet as ft
 
 DB_FILE = "data.db"
@@ -14,8 +14,60 @@ if not os.path.exists(AUDIO_DIR):
 if not os.path.exists(THUMBNAIL_DIR):
     os.makedirs(THUMBNAIL_DIR)
 
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.opus', '.ogg', '.aac', '.flac', '.wav')
+
+def find_audio_file(video_id):
+    for ext in AUDIO_EXTENSIONS:
+        path = os.path.abspath(os.path.join(AUDIO_DIR, f"{video_id}{ext}"))
+        if os.path.exists(path):
+            return path
+    return None
+
+def find_chapter_files(video_id):
+    # chapters of a split video are stored as <id>.c01.<ext>, <id>.c02.<ext>, ...
+    paths = glob.glob(os.path.join(AUDIO_DIR, glob.escape(video_id) + ".c[0-9][0-9].*"))
+    return sorted(os.path.abspath(p) for p in paths if os.path.splitext(p)[1].lower() in AUDIO_EXTENSIONS and ".tmp." not in p)
+
+def is_managed_path(path):
+    # only files the app downloaded itself may be deleted; imported folders belong to the user
+    try:
+        return os.path.commonpath([os.path.abspath(path), BASE_DIR]) == BASE_DIR
+    except ValueError:
+        return False
+
+def remove_partial_files(video_id):
+    # download leftovers are named "<id>.source.<ext>" (plus yt-dlp's .part/.ytdl files),
+    # unfinished ffmpeg output "<id>.tmp.<ext>" or "<id>.cNN.tmp.<ext>"
+    prefix = os.path.join(glob.escape(AUDIO_DIR), glob.escape(video_id))
+    for path in glob.glob(f"{prefix}.source.*") + glob.glob(f"{prefix}.tmp.*") + glob.glob(f"{prefix}.c[0-9][0-9].tmp.*"):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def warm_file(path):
+    # pull a file into the page cache ahead of playback so the first read does not stall on disk
+    if hasattr(os, "posix_fadvise"):
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+            return
+        except OSError:
+            pass
+    def read():
+        try:
+            with open(path, "rb") as f:
+                while f.read(1 << 20):
+                    pass
+        except OSError:
+            pass
+    threading.Thread(target=read, daemon=True).start()
+
 def format_duration(seconds):
-    return time.strftime("%H:%M:%S", time.gmtime(seconds))
+    return time.strftime("%H:%M:%S", time.gmtime(seconds or 0))
 
 def format_duration_string(total_seconds: int) -> str:
     if total_seconds is None or total_seconds == 0:
@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from . import activity
+from .db import DbService, remove_managed_file
+from .downloader import get_download_client
+from .media import verify_audio
+from .progress import QuietProgress
+from .storage import quota_lock
+from .utils import is_managed_path
+
+def _check(job):
+    path, size, duration = job
+    try:
+        return verify_audio(path, size, duration) is not None
+    except Exception as e:
+        print(f"Could not verify {path}: {e}")
+        return True
+
+def verify_library(stop_event=None):
+    """
+    Checks every downloaded file in parallel with a header and duration probe.
+    Broken or missing files are removed and their playlists queued for another
+    download, which fetches just the missing tracks. Imported files are only
+    reported, they belong to the user. Returns the number of broken files.
+    """
+    rows = DbService.get_files_for_verification()
+    if not rows:
+        return 0
+    broken = []
+    with ProcessPoolExecutor(max_workers=DbService.get_performance_workers()) as pool:
+        results = pool.map(_check, [(row["file_path"], row["size"], row["duration"]) for row in rows], chunksize=8)
+        for row, ok in zip(rows, results):
+            if not ok:
+                broken.append(row)
+            if stop_event is not None and stop_event.is_set():
+                pool.shutdown(cancel_futures=True)
+                break
+
+    requeue = {}
+    with quota_lock:
+        # tracks evicted or re-encoded while we were probing are gone on purpose
+        still_local = {row["id"]: row["file_path"] for row in DbService.get_files_for_verification()}
+        broken = [row for row in broken if still_local.get(row["id"]) == row["file_path"]]
+        for row in broken:
+            if not is_managed_path(row["file_path"]):
+                print(f"Imported file is missing or unreadable: {row['file_path']}")
+                continue
+            print(f"Removing broken download: {row['file_path']}")
+            remove_managed_file(row["file_path"])
+            if row["link"] and row["playlist_link"]:
+                requeue[row["playlist_name"]] = row["playlist_link"]
+    client = get_download_client()
+    for name, link in requeue.items():
+        client.submit(link, name, QuietProgress(f"Re-download {name}"))
+    print(f"Verification: checked {len(rows)} files, {len(broken)} broken, {len(requeue)} playlists re-queued")
+    return len(broken)
+
+def start_verification(on_done=None, stop_event=None):
+    stop_event = stop_event or threading.Event()
+    def run():
+        if not activity.wait_until_idle(stop_event, settle=2.0):
+            return
+        broken = 0
+        try:
+            broken = verify_library(stop_event)
+        except Exception as e:
+            print(f"Library verification failed: {e}")
+        if on_done:
+            on_done(broken)
+    threading.Thread(target=run, daemon=True).start()
+    return stop_event
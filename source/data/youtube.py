@@ -1,74 +1,212 @@
-from .db import DbService 
-import os, random, requests
-from yt_dlp import YoutubeDL
-from .utils import AUDIO_DIR, THUMBNAIL_DIR 
+from .db import DbService, remove_managed_file
+import os, random
+from yt_dlp.utils import DownloadCancelled
+from .backends import backend_for
+from .utils import AUDIO_DIR, THUMBNAIL_DIR, find_audio_file, find_chapter_files, remove_partial_files
+from .jobs import JobControl, JobCancelled
+from .media import postprocess_audio, metadata_from_info, usable_chapters, split_chapters, probe_file, verify_audio
+from .pipeline import Stage, Pipeline
 
-def download_playlist(playlist_link, playlist_name, page, progress_text, progress_bar, is_batch=False):
-    playlist_info = DbService.get_playlist_info(playlist_name)
-    if not playlist_info:
-        progress_text.value = f"Error: Playlist '{playlist_name}' not found."
-        page.update()
-        return
-    thumb_dir = THUMBNAIL_DIR 
+AUDIO_FORMATS = {
+    "mp3": 'bestaudio/best',
+    # m4a first so "native" mode can usually keep the download untouched
+    "native": 'bestaudio[ext=m4a]/bestaudio/best',
+}
+
+def write_cookies_file():
     cookies = DbService.get_setting("cookies", "")
-    cookies_file = None
-    if cookies:
-        cookies_file = f"cookies_{random.randint(1000, 9999)}.txt"
-        try:
-            with open(cookies_file, "w") as f:
-                f.write(cookies)
-        except Exception:
-            cookies_file = None 
-    ydl_opts = {
+    if not cookies:
+        return None
+    cookies_file = f"cookies_{random.randint(1000, 9999)}.txt"
+    try:
+        with open(cookies_file, "w") as f:
+            f.write(cookies)
+    except Exception:
+        return None
+    return cookies_file
+
+def build_ydl_opts(mode, cookies_file=None):
+    return {
         'ignoreerrors': True,
-        'format': 'bestaudio/best',
-        'outtmpl': os.path.join(AUDIO_DIR, '%(id)s.%(ext)s'), 
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192',
-        }, {
-            'key': 'EmbedThumbnail',
-        }, {
-            'key': 'FFmpegMetadata',
-        }],
+        'format': AUDIO_FORMATS.get(mode, AUDIO_FORMATS["mp3"]),
+        'outtmpl': os.path.join(AUDIO_DIR, '%(id)s.source.%(ext)s'), 
         'cookiefile': cookies_file,
         'http_headers': {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         },
         'verbose': False, 
     }
-    current_idx = {"i": 0}
-    current_title = {"t": ""}
-    total_videos = 0
-    def progress_hook(status):
-        nonlocal current_title, current_idx, total_videos
-        st = status.get("status")
-        downloaded = status.get("downloaded_bytes") or status.get("downloaded_bytes_temp") or 0
-        total = status.get("total_bytes") or status.get("total_bytes_estimate") or 1 
-        percent = (downloaded / total) * 100 if total > 0 else 0
-        if st in ('downloading', 'finished', 'error'):
-            total_progress = (current_idx["i"] - 1 + (percent / 100)) / total_videos if total_videos > 0 else 0
-            status_map = {
-                "downloading": "Downloading",
-                "finished": "Completed",
-                "error": "Failed"
-            }
-            progress_text.value = f"{status_map.get(st, st)} ({current_idx['i']}/{total_videos}): {current_title['t']} - {percent:.1f}%"
-            progress_bar.value = total_progress
+
+def fetch_track(link, file_path, title=None):
+    """
+    Downloads a single video again for a row that already exists, e.g. a track
+    evicted by the storage quota. Keeps the row's format where it can and
+    returns the (verified) path the audio ended up at.
+    """
+    stem, ext = os.path.splitext(file_path)
+    mode = "mp3" if ext.lower() == ".mp3" else "native"
+    cookies_file = write_cookies_file()
+    try:
+        with backend_for(link, build_ydl_opts(mode, cookies_file)) as backend:
+            info = backend.download(link, [])
+    finally:
+        if cookies_file and os.path.exists(cookies_file):
+            os.remove(cookies_file)
+    downloads = (info or {}).get("requested_downloads") or []
+    source_path = downloads[0].get("filepath") if downloads else None
+    if not source_path or not os.path.exists(source_path):
+        raise RuntimeError(f"Could not download {link}")
+    target = os.path.abspath(postprocess_audio(source_path, stem, mode, title, tags=metadata_from_info(info)))
+    if verify_audio(target) is None:
+        os.remove(target)
+        raise RuntimeError(f"Downloaded file for {link} is unreadable")
+    return target
+
+def file_stats(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+def renumber_playlist(playlist_name):
+    songs = DbService.get_playlist_data(playlist_name)
+    DbService.update_playlist_order(playlist_name, [song["file_path"] for song in songs])
+
+def run_playlist_download(playlist_link, playlist_name, progress, control=None, limiter=None):
+    control = control or JobControl()
+    playlist_info = DbService.get_playlist_info(playlist_name)
+    if not playlist_info:
+        progress.set_message(f"Error: Playlist '{playlist_name}' not found.")
+        return
+    thumb_dir = THUMBNAIL_DIR 
+    cookies_file = write_cookies_file()
+    mode = DbService.get_setting("download_mode", "mp3")
+    split = DbService.get_setting("split_chapters", "0") == "1"
+    split_workers = DbService.get_performance_workers()
+    reorder = {"needed": False}
+    ydl_opts = build_ydl_opts(mode, cookies_file)
+    if limiter is not None and limiter.rate > 0:
+        ydl_opts['ratelimit'] = limiter.rate
+
+    backend = backend_for(playlist_link, ydl_opts)
+
+    def drop_if_cancelled(item):
+        if not control.cancelled.is_set():
+            return False
+        remove_partial_files(item["id"])
+        progress.complete(item["id"])
+        return True
+
+    def fetch(item):
+        if drop_if_cancelled(item):
+            return None
+        received = {"bytes": 0}
+        def control_hook(status):
+            downloaded = status.get("downloaded_bytes") or 0
+            if limiter is not None:
+                limiter.consume(downloaded - received["bytes"], control.cancelled)
+            received["bytes"] = downloaded
+            if control.checkpoint():
+                raise DownloadCancelled("Download cancelled")
+        try:
+            info = backend.download(item["url"], [progress.hook(item["id"], item["title"]), control_hook])
+        except DownloadCancelled:
+            info = None
+        if drop_if_cancelled(item):
+            return None
+        downloads = (info or {}).get("requested_downloads") or []
+        source_path = downloads[0].get("filepath") if downloads else None
+        if not source_path or not os.path.exists(source_path):
+            progress.complete(item["id"])
+            return None
+        item["source_path"] = source_path
+        item["tags"] = metadata_from_info(info)
+        item["chapters"] = usable_chapters(info.get("chapters"), info.get("duration")) if split else []
+        return item
+
+    def postprocess(item):
+        if drop_if_cancelled(item):
+            return None
+        progress.report(item["id"], item["title"], {"status": "processing"})
+        target_stem = os.path.join(AUDIO_DIR, item["id"])
+        item["audio_path"] = os.path.abspath(postprocess_audio(item["source_path"], target_stem, mode, item["title"], control.cancelled, item.get("tags")))
+        checked = verify_audio(item["audio_path"])
+        if checked is None:
+            os.remove(item["audio_path"])
+            raise RuntimeError(f"Post-processed file for {item['title']} is unreadable")
+        item["duration"] = int(round(checked["duration"]))
+        item["tracks"] = None
+        if item["chapters"]:
             try:
-                page.update()
-            except Exception:
-                pass 
+                item["tracks"] = split_chapters(item["audio_path"], target_stem, item["chapters"], split_workers, control.cancelled)
+            except JobCancelled:
+                raise
+            except Exception as e:
+                print(f"Could not split {item['title']} into chapters, keeping it whole: {e}")
+        return item
+
+    def fetch_thumbnail(item):
+        item["thumbnail_path"] = None
+        thumb_url = item["entry"].get('thumbnail')
+        if thumb_url:
+            thumb_path = os.path.join(thumb_dir, f"{item['id']}.jpg")
+            if not os.path.exists(thumb_path):
+                try:
+                    if backend.fetch_thumbnail(thumb_url, thumb_path):
+                        item["thumbnail_path"] = os.path.abspath(thumb_path)
+                except Exception:
+                    pass
+            else:
+                item["thumbnail_path"] = os.path.abspath(thumb_path)
+        return item
+
+    def register(item):
+        if item["tracks"]:
+            # chapters share the video's index and keep chapter order through their ids;
+            # the playlist is renumbered once the whole download has finished
+            DbService.add_files(playlist_name, [dict(
+                title=track["title"],
+                file_path=track["file_path"],
+                duration=track["duration"],
+                thumbnail_path=item["thumbnail_path"],
+                link=item["url"],
+                song_index=item["song_index"],
+                **file_stats(track["file_path"]),
+            ) for track in item["tracks"]])
+            reorder["needed"] = True
+            for track in item["tracks"]:
+                progress.track_added(playlist_name, track["file_path"])
+            progress.complete(item["id"])
+            return
+        # an upsert, so a track re-fetched after failing verification keeps its row
+        DbService.add_files(playlist_name, [dict(
+            title=item["title"],
+            file_path=item["audio_path"],
+            duration=item["duration"],
+            thumbnail_path=item["thumbnail_path"],
+            link=item["url"],
+            song_index=item["song_index"],
+            **file_stats(item["audio_path"]),
+        )])
+        progress.track_added(playlist_name, item["audio_path"])
+        progress.complete(item["id"])
+
+    def on_stage_error(item, error):
+        remove_partial_files(item["id"])
+        progress.complete(item["id"])
     try:
-        with YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(playlist_link, download=False)
+        with backend:
+            info = backend.extract_playlist(playlist_link)
+            if control.cancelled.is_set():
+                return
             videos_to_download = []
             
             current_max_index = -1
             songs_in_playlist = DbService.get_playlist_data(playlist_name)
             if songs_in_playlist:
                 current_max_index = max(song.get("song_index", -1) for song in songs_in_playlist)
+            # evicted tracks have no file on purpose; they come back through request_refetch, not a sync
+            evicted = [song for song in songs_in_playlist if song.get("cloud")]
+            evicted_ids = {os.path.basename(song["file_path"]).split(".")[0] for song in evicted}
+            evicted_links = {song["link"] for song in evicted if song.get("link")}
             
             initial_song_index = current_max_index + 1
             entry_counter = 0
@@ -78,104 +216,99 @@ def download_playlist(playlist_link, playlist_name, page, progress_text, progres
                 if not entry: continue
                 video_id = entry.get('id')
                 if not video_id: continue
-                mp3_filename = f"{video_id}.mp3"
-                mp3_path = os.path.join(AUDIO_DIR, mp3_filename)
-                abs_mp3 = os.path.abspath(mp3_path).replace('\\\\', '\\').strip('"')
+                if video_id in evicted_ids or entry.get('webpage_url') in evicted_links:
+                    continue
+                abs_audio = find_audio_file(video_id)
                 
-                if DbService.file_exists(playlist_name, abs_mp3):
+                if abs_audio and DbService.file_exists(playlist_name, abs_audio):
+                    continue
+                checked = verify_audio(abs_audio) if abs_audio else None
+                if abs_audio and checked is None:
+                    # truncated or unreadable leftover: download it again instead of registering it
+                    print(f"Discarding unreadable file {abs_audio}")
+                    remove_managed_file(abs_audio)
+                    abs_audio = None
+
+                chapter_files = [] if abs_audio else find_chapter_files(video_id)
+                if chapter_files and DbService.file_exists(playlist_name, chapter_files[0]):
                     continue
                     
                 entry_counter += 1
+
+                if chapter_files:
+                    tracks = []
+                    for path in chapter_files:
+                        info_tags = probe_file(path) or {}
+                        tracks.append({
+                            "title": info_tags.get("title") or entry.get('title'),
+                            "file_path": path,
+                            "duration": int(round(info_tags["duration"])) if info_tags.get("duration") else None,
+                            "link": entry.get('webpage_url'),
+                            "song_index": initial_song_index + entry_counter - 1,
+                        })
+                    DbService.add_files(playlist_name, tracks)
+                    reorder["needed"] = True
+                    for track in tracks:
+                        progress.track_added(playlist_name, track["file_path"])
+                    continue
                 
-                if os.path.exists(abs_mp3):
+                if abs_audio:
                     DbService.add_file(
                         playlist_name, 
                         entry.get('title'), 
                         entry.get('title'), 
-                        abs_mp3,
-                        entry.get('duration'),
+                        abs_audio,
+                        int(round(checked["duration"])),
                         None, 
                         entry.get('webpage_url'),
                         initial_song_index + entry_counter - 1 
                     )
+                    progress.track_added(playlist_name, abs_audio)
                     continue
                 videos_to_download.append(entry)
             
             total_videos = len(videos_to_download)
             if total_videos == 0 and entry_counter > 0:
-                progress_text.value = "All files already downloaded."
-                progress_bar.value = 1.0
-                page.update()
+                if reorder["needed"]:
+                    renumber_playlist(playlist_name)
+                progress.set_message("All files already downloaded.", 1.0)
                 return
             elif total_videos == 0 and entry_counter == 0:
-                progress_text.value = "No new videos found."
-                progress_bar.value = 1.0
-                page.update()
+                progress.set_message("No new videos found.", 1.0)
                 return
             
-            ydl_opts['progress_hooks'] = [progress_hook] 
-            
-            current_download_index = 0
-            
-            for idx, entry in enumerate(videos_to_download, start=1):
-                current_idx["i"] = idx
-                current_download_index = initial_song_index + entry_counter - total_videos + idx - 1
-                current_title["t"] = entry.get("title") or entry.get("id") or "Unknown Title"
-                video_id = entry.get('id')
-                progress_text.value = f"Starting Download ({idx}/{total_videos}): {current_title['t']}"
-                progress_bar.value = (idx - 1) / total_videos 
-                page.update()
-                
-                with YoutubeDL(ydl_opts) as ydl_dl:
-                    ydl_dl.download([entry['webpage_url']])
-                    
-                final_mp3_filename = f"{video_id}.mp3"
-                final_mp3_path = os.path.join(AUDIO_DIR, final_mp3_filename)
-                abs_mp3 = os.path.abspath(final_mp3_path).replace('\\\\', '\\').strip('"')
-                
-                abs_thumb_path = None
-                thumb_url = entry.get('thumbnail')
-                
-                if thumb_url:
-                    thumb_path = os.path.join(thumb_dir, f"{video_id}.jpg")
-                    
-                    if not os.path.exists(thumb_path):
-                        try:
-                            r = requests.get(thumb_url, timeout=10)
-                            if r.status_code == 200:
-                                with open(thumb_path, 'wb') as f:
-                                    f.write(r.content)
-                            abs_thumb_path = os.path.abspath(thumb_path)
-                        except Exception:
-                            pass
-                    else:
-                        abs_thumb_path = os.path.abspath(thumb_path)
-                        
-                if os.path.exists(abs_mp3):
-                    DbService.add_file(
-                        playlist_name,
-                        current_title['t'],
-                        current_title['t'],
-                        abs_mp3,
-                        entry.get('duration'),
-                        abs_thumb_path,
-                        entry.get('webpage_url'),
-                        current_download_index 
-                    )
-                
-                progress_text.value = f"Finished ({idx}/{total_videos}): {current_title['t']}"
-                progress_bar.value = idx / total_videos
-                page.update()
+            progress.set_total(total_videos)
+            workers = DbService.get_pipeline_workers()
+            pipeline = Pipeline([
+                Stage("fetch", fetch, workers["fetch"]),
+                Stage("postprocess", postprocess, workers["postprocess"]),
+                Stage("thumbnail", fetch_thumbnail, workers["thumbnail"]),
+                Stage("register", register, workers["register"]),
+            ], on_error=on_stage_error).start()
+            try:
+                for idx, entry in enumerate(videos_to_download, start=1):
+                    if control.cancelled.is_set():
+                        break
+                    pipeline.submit({
+                        "entry": entry,
+                        "id": entry.get('id'),
+                        "title": entry.get("title") or entry.get("id") or "Unknown Title",
+                        "url": entry.get('webpage_url'),
+                        "song_index": initial_song_index + entry_counter - total_videos + idx - 1,
+                    })
+            finally:
+                pipeline.close()
+                if reorder["needed"]:
+                    renumber_playlist(playlist_name)
                 
     except Exception as e:
-        progress_text.value = f"A critical download error occurred: {e}"
-        progress_bar.value = 1.0 
-        page.update()
+        progress.set_message(f"A critical download error occurred: {e}", 1.0)
         print(f"Download error: {e}")
         
     finally:
         if cookies_file and os.path.exists(cookies_file):
             os.remove(cookies_file)
-        progress_text.value = "Download complete!"
-        progress_bar.value = 1.0
-        page.update()
\ No newline at end of file
+        if control.cancelled.is_set():
+            progress.set_message("Download cancelled.", 1.0)
+        else:
+            progress.set_message("Download complete!", 1.0)
\ No newline at end of file
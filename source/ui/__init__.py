@@ -1,7 +1,20 @@
+import os, threading
 import flet as ft
+import flet_audio as fa
 from source.theme import DARK_BG
-from .views.player_view import get_player_view 
+from source.data import activity, events
+from source.data.db import DbService
+from source.data.checkpoint import load_checkpoint
+from source.data.utils import format_duration
+from source.data.sync import SyncScheduler
+from source.data.backfill import start_duration_backfill
+from source.data.verify import start_verification
+from source.data.storage import enforce_quota
+from source.data.archive import start_archive
+from source.data.analysis import start_analysis
+from .views.player_view import get_player_view
 from .views.main_list_view import get_main_list_view
+from .audio_player import Player
 
 def build_ui(page: ft.Page):
     page.title = "IrisPlayer"
@@ -12,16 +25,59 @@ def build_ui(page: ft.Page):
     main_content_area = ft.Container(expand=True)
     page.add(main_content_area)
 
+    # one playback engine for the whole session; views attach to it
+    audio = fa.Audio(volume=float(DbService.get_setting("volume", 0.4)))
+    standby_audio = fa.Audio(volume=audio.volume)
+    page.overlay.extend([audio, standby_audio])
+    player = Player(audio, [], lambda: None, int(DbService.get_setting("skip_seconds", 10)), standby=standby_audio)
+    page.on_disconnect = lambda e: player.checkpoint(flush=True)
+
+    # resume from the last checkpoint: only the one track is loaded up front
+    checkpoint = load_checkpoint()
+    resumed = [song for song in DbService.get_songs_by_ids([checkpoint["id"]]) if os.path.exists(song["file_path"])] if checkpoint else []
+    if resumed:
+        player.restore(resumed[0], checkpoint)
+
     def switch_to_view(controls: list):
         main_content_area.content = ft.Column(controls, expand=True)
         page.update()
 
     def open_main_list_view():
-        controls = get_main_list_view(page, open_player_view)
-        switch_to_view(controls)
+        with activity.busy("view"):
+            controls = get_main_list_view(page, open_player_view, player)
+            switch_to_view(controls)
         
     def open_player_view(playlist_name: str):
-        controls = get_player_view(page, playlist_name, open_main_list_view)
-        switch_to_view(controls)
+        with activity.busy("view"):
+            controls = get_player_view(page, playlist_name, open_main_list_view, player)
+            switch_to_view(controls)
+
+    open_main_list_view()
+    if resumed:
+        song = resumed[0]
+        page.snack_bar = ft.SnackBar(
+            ft.Text(f"Resume '{song['title']}' at {format_duration(player.position)}?"),
+            action="Resume", on_action=lambda e: player.toggle_play(), duration=8000, open=True
+        )
+        page.update()
+        def load_playlist():
+            name = checkpoint.get("playlist")
+            songs = DbService.get_playlist_data(name) if name else []
+            if songs and player.name == name:
+                player.set_songs(songs, name)
+                if checkpoint.get("shuffle") and not player.shuffle:
+                    player.toggle_shuffle()
+        threading.Thread(target=load_playlist, daemon=True).start()
+    SyncScheduler.from_settings().start()
 
-    open_main_list_view()
\ No newline at end of file
+    # one maintenance job at a time: each one probes, moves or deletes files the next one reads
+    def after_backfill(updated):
+        if updated:
+            events.publish(events.PLAYLIST_CHANGED)
+        start_verification(on_done=after_verification)
+    def after_verification(broken):
+        enforce_quota()
+        start_archive(on_done=after_archive)
+    def after_archive(reclaimed):
+        start_analysis(on_done=lambda done: done and events.publish(events.PLAYLIST_CHANGED))
+    start_duration_backfill(on_done=after_backfill)
\ No newline at end of file
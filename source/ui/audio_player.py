@@ -1,14 +1,228 @@
-import random
+import os, random, time
+from collections import deque
 import flet as ft
 import flet_audio as fa
 from source.data.db import DbService 
+from source.data import activity, events
+from source.data.storage import request_refetch
+from source.data.checkpoint import Checkpointer
+from source.data.utils import warm_file
+
+# shuffle orders by playlist name, so reopening a playlist continues where its shuffle left off
+_shuffle_orders = {}
+
+class ShuffleOrder:
+    """
+    A shuffled permutation of track keys walked with a cursor: everything up to
+    the cursor has been played in this cycle, the rest is still to come.
+    Next and previous are O(1); the next cycle's permutation is drawn when a
+    cycle is exhausted and only replaces this one once advance() moves onto it. Keys are file paths, so reordering the playlist does not
+    affect it and adding or removing tracks only touches those tracks.
+    """
+    __slots__ = ['keys', 'pos', 'cursor', 'upcoming']
+    def __init__(self, keys, first=None):
+        self.keys = list(keys)
+        random.shuffle(self.keys)  # Fisher-Yates
+        self.pos = {key: i for i, key in enumerate(self.keys)}
+        self.cursor = -1
+        self.upcoming = None
+        if first in self.pos:
+            self._swap(self.pos[first], 0)
+            self.cursor = 0
+
+    def _swap(self, i, j):
+        keys = self.keys
+        keys[i], keys[j] = keys[j], keys[i]
+        self.pos[keys[i]] = i
+        self.pos[keys[j]] = j
+
+    def peek_next(self):
+        if not self.keys:
+            return None
+        if self.cursor + 1 < len(self.keys):
+            return self.keys[self.cursor + 1]
+        if self.upcoming is None:
+            # cycle finished: draw the next one, without repeating the last track straight away
+            self.upcoming = self.keys[:]
+            random.shuffle(self.upcoming)
+            if len(self.upcoming) > 1 and self.upcoming[0] == self.keys[self.cursor]:
+                i = random.randint(1, len(self.upcoming) - 1)
+                self.upcoming[0], self.upcoming[i] = self.upcoming[i], self.upcoming[0]
+        return self.upcoming[0]
+
+    def advance(self):
+        """Moves onto the track peek_next() returned, starting the next cycle if this one is done."""
+        if self.peek_next() is None:
+            return
+        if self.cursor + 1 >= len(self.keys):
+            self.keys, self.upcoming = self.upcoming, None
+            self.pos = {key: i for i, key in enumerate(self.keys)}
+            self.cursor = -1
+        self.cursor += 1
+
+    def peek_previous(self):
+        return self.keys[self.cursor - 1] if self.cursor > 0 else None
+
+    def select(self, key):
+        p = self.pos.get(key)
+        if p is None or p == self.cursor:
+            return
+        if p == self.cursor - 1 or p == self.cursor + 1:
+            self.cursor = p
+        elif p > self.cursor:
+            # picked by hand: it becomes the next track of the permutation
+            self._swap(p, self.cursor + 1)
+            self.cursor += 1
+        else:
+            # played earlier in this cycle: move it up to the current slot
+            self.keys.pop(p)
+            self.keys.insert(self.cursor, key)
+            for i in range(p, self.cursor + 1):
+                self.pos[self.keys[i]] = i
+
+    def rekey(self, old, new):
+        p = self.pos.pop(old, None)
+        if p is not None:
+            self.keys[p] = new
+            self.pos[new] = p
+        if self.upcoming is not None and old in self.upcoming:
+            self.upcoming[self.upcoming.index(old)] = new
+
+    def sync(self, keys):
+        """Drops tracks that are gone and inserts new ones at random places among the unplayed ones."""
+        if len(keys) == len(self.pos) and all(key in self.pos for key in keys):
+            return
+        present = set(keys)
+        played = [key for key in self.keys[:self.cursor + 1] if key in present]
+        rest = [key for key in self.keys[self.cursor + 1:] if key in present]
+        for key in keys:
+            if key not in self.pos:
+                rest.insert(random.randint(0, len(rest)), key)
+        self.keys = played + rest
+        self.pos = {key: i for i, key in enumerate(self.keys)}
+        self.cursor = len(played) - 1
+        self.upcoming = None
+
+class UpNext:
+    """
+    Tracks queued to play before the playlist continues, from any playlist.
+    Entries are (song id, token) pairs in a deque; a track is live while its
+    id still maps to that token, so removing it is a dict delete and the stale
+    entry is skipped when it reaches the front. Queueing a track that is
+    already queued moves it.
+    """
+    __slots__ = ['_entries', '_live', '_songs', '_token']
+    def __init__(self, songs=()):
+        self._entries = deque()
+        self._live = {}
+        self._songs = {}
+        self._token = 0
+        for song in songs:
+            self.add(song, save=False)
+
+    def __len__(self):
+        return len(self._live)
+
+    def _track(self, song):
+        self._token += 1
+        self._live[song["id"]] = self._token
+        self._songs[song["id"]] = song
+        return (song["id"], self._token)
+
+    def add(self, song, save=True):
+        self._entries.append(self._track(song))
+        self._compact()
+        if save:
+            self.save()
+
+    def add_next(self, song):
+        self._entries.appendleft(self._track(song))
+        self._compact()
+        self.save()
+
+    def remove(self, song_id):
+        if self._live.pop(song_id, None) is not None:
+            self._songs.pop(song_id, None)
+            self.save()
+
+    def clear(self):
+        self._entries.clear()
+        self._live.clear()
+        self._songs.clear()
+        self.save()
+
+    def _front(self):
+        while self._entries:
+            song_id, token = self._entries[0]
+            if self._live.get(song_id) == token:
+                return song_id
+            self._entries.popleft()
+        return None
+
+    def peek(self):
+        song_id = self._front()
+        return self._songs[song_id] if song_id is not None else None
+
+    def pop(self):
+        song_id = self._front()
+        if song_id is None:
+            return None
+        self._entries.popleft()
+        del self._live[song_id]
+        song = self._songs.pop(song_id)
+        self.save()
+        return song
+
+    def songs(self):
+        return [self._songs[song_id] for song_id, token in self._entries if self._live.get(song_id) == token]
+
+    def move(self, old, new):
+        songs = self.songs()
+        songs.insert(new, songs.pop(old))
+        self._entries = deque((song["id"], self._live[song["id"]]) for song in songs)
+        self.save()
+
+    def _compact(self):
+        # removals leave stale entries behind; drop them once they outnumber the live ones
+        if len(self._entries) > 2 * len(self._live) + 32:
+            self._entries = deque(entry for entry in self._entries if self._live.get(entry[0]) == entry[1])
+
+    def save(self):
+        # a short id list in the settings table, rewritten only when the queue changes
+        DbService.set_setting("up_next", ",".join(str(song["id"]) for song in self.songs()))
+
+_up_next = None
+
+def get_up_next():
+    global _up_next
+    if _up_next is None:
+        ids = [int(i) for i in DbService.get_setting("up_next", "").split(",") if i.isdigit()]
+        _up_next = UpNext(DbService.get_songs_by_ids(ids))
+    return _up_next
 
 class Player:
-    __slots__ = ['audio','songs','update_ui','SK','current_index','duration','position','state','shuffle','loop']
-    def __init__(self, audio: fa.Audio, songs, update_ui, SK=10):
+    """
+    The playback engine. One instance lives for the whole session (created in
+    build_ui); views attach their refresh callbacks to it instead of owning it,
+    so switching views neither stops nor reloads playback.
+    """
+    __slots__ = ['audio','_songs','_positions','name','order','update_ui','SK','current_index','duration','position','state','shuffle','loop',
+                 'base_volume','normalize','skip_silence','_start_at','_end_at',
+                 'standby','queue','queued',
+                 'on_position','_tick_interval','_last_tick','checkpointer']
+    def __init__(self, audio: fa.Audio, songs, update_ui, SK=10, standby: fa.Audio = None, name=None, on_position=None):
         self.audio = audio
-        self.songs = songs
+        # second control holding the predicted next track, loaded but paused, so a
+        # track change is a swap instead of a load round trip through the client
+        self.standby = standby
+        # the up-next queue plays before the playlist continues from current_index
+        self.queue = get_up_next()
+        self.queued = None
         self.update_ui = update_ui 
+        # position ticks only refresh the seek bar, at most position_fps times a second
+        self.on_position = on_position or update_ui
+        self._last_tick = 0.0
+        self.checkpointer = Checkpointer()
         self.SK = SK
         self.current_index = 0
         self.duration = 0.0
@@ -16,13 +230,114 @@ class Player:
         self.state = "paused"
         self.shuffle = False
         self.loop = False
+        self.name = None
+        self.order = None
+        self.set_songs(songs, name)
+        # analysis results (gain, silent intro/outro) are applied when a track starts
+        self.base_volume = audio.volume
+        self.load_settings()
+        self._start_at = 0.0
+        self._end_at = None
         
         if self.songs:
             self.audio.src = self.songs[self.current_index].get("file_path", "")
-        self.audio.on_state_changed = self._on_state_changed
-        self.audio.on_duration_changed = self._on_duration_changed
-        self.audio.on_position_changed = self._on_position_changed
-        self.audio.on_seek_complete = self._on_seek_complete
+            self.duration = float(self.songs[self.current_index].get("duration") or 0)
+        for control in (audio, standby):
+            if control is not None:
+                self._bind(control)
+        # files can move under the engine while no view holding them is open
+        events.subscribe("player", self._on_data_event)
+
+    def _on_data_event(self, event):
+        if event.kind == events.TRACK_MOVED:
+            self.relocate(event.file_path, event.new_path)
+
+    def relocate(self, old, new):
+        """Points every copy of a track the engine holds at its new file: list, shuffle orders and queue."""
+        index = self._positions.pop(old, None)
+        if index is not None:
+            self._songs[index]["file_path"] = new
+            self._positions[new] = index
+        orders = set(_shuffle_orders.values())
+        orders.add(self.order)
+        orders.discard(None)
+        for order in orders:
+            order.rekey(old, new)
+        for song in (*self.queue.songs(), self.queued):
+            if song is not None and song.get("file_path") == old:
+                song["file_path"] = new
+
+    def load_settings(self):
+        self.normalize = DbService.get_setting("normalize_loudness", "1") == "1"
+        self.skip_silence = DbService.get_setting("skip_silence", "1") == "1"
+        try:
+            self.SK = int(DbService.get_setting("skip_seconds", str(self.SK)))
+            self._tick_interval = 1 / max(1, int(DbService.get_setting("position_fps", "4")))
+        except ValueError:
+            self._tick_interval = 0.25
+
+    def attach(self, update_ui, on_position=None):
+        # the view on screen receives the refreshes; settings may have changed since the last one
+        self.update_ui = update_ui
+        self.on_position = on_position or update_ui
+        self.load_settings()
+
+    @property
+    def songs(self):
+        return self._songs
+
+    @songs.setter
+    def songs(self, songs):
+        self.set_songs(songs)
+
+    def set_songs(self, songs, name=None):
+        # the same playlist reloaded: keep pointing at the track that is playing
+        same_list = name is None or name == self.name
+        previous = self.current_song() if same_list and self.queued is None and getattr(self, "_songs", None) else None
+        self._songs = songs
+        self._positions = {song.get("file_path"): i for i, song in enumerate(songs)}
+        if name is not None and name != self.name:
+            self.name = name
+            self.order = _shuffle_orders.get(name)
+            self.shuffle = self.order is not None
+        if self.order is not None:
+            self.order.sync(list(self._positions))
+        if previous is not None:
+            self.current_index = self._positions.get(previous.get("file_path"), min(self.current_index, max(0, len(songs) - 1)))
+
+    def move_song(self, old, new):
+        song = self._songs.pop(old)
+        self._songs.insert(new, song)
+        for i in range(min(old, new), max(old, new) + 1):
+            self._positions[self._songs[i].get("file_path")] = i
+        if self.current_index == old:
+            self.current_index = new
+        elif old < self.current_index <= new:
+            self.current_index -= 1
+        elif new <= self.current_index < old:
+            self.current_index += 1
+
+    def index_of(self, path):
+        return self._positions.get(path)
+
+    def remove_song(self, index):
+        song = self._songs.pop(index)
+        self._positions.pop(song.get("file_path"), None)
+        for i in range(index, len(self._songs)):
+            self._positions[self._songs[i].get("file_path")] = i
+        if self.order is not None:
+            self.order.sync(list(self._positions))
+        if self.current_index > index or self.current_index >= len(self._songs):
+            self.current_index = max(0, self.current_index - 1)
+
+    def _bind(self, control):
+        # both controls share the handlers; only events of the one playing count
+        def active_only(handler):
+            return lambda e: handler(e) if control is self.audio else None
+        control.on_state_changed = active_only(self._on_state_changed)
+        control.on_duration_changed = active_only(self._on_duration_changed)
+        control.on_position_changed = active_only(self._on_position_changed)
+        control.on_seek_complete = active_only(self._on_seek_complete)
 
     def _on_state_changed(self, e):
         self.state = e.data or "paused"
@@ -34,12 +349,32 @@ class Player:
     def _on_duration_changed(self, e):
         if e.data:
             self.duration = float(e.data) / 1000
+        if self._start_at > 0:
+            self.audio.seek(int(self._start_at * 1000))
+            self._start_at = 0.0
         self.update_ui()
 
     def _on_position_changed(self, e):
         if e.data:
             self.position = float(e.data) / 1000
-        self.update_ui()
+        if self._end_at and self.position >= self._end_at and self.state == "playing":
+            self._end_at = None
+            self._on_completed()
+            return
+        now = time.monotonic()
+        if now - self._last_tick >= self._tick_interval:
+            self._last_tick = now
+            self.on_position()
+            self.checkpoint()
+
+    def _track_volume(self, song):
+        gain = song.get("gain_db") if self.normalize else None
+        return min(1.0, self.base_volume * 10 ** (gain / 20)) if gain else self.base_volume
+
+    def _apply_analysis(self, song):
+        self.audio.volume = self._track_volume(song)
+        self._start_at = float(song.get("silence_start") or 0) if self.skip_silence else 0.0
+        self._end_at = song.get("silence_end") if self.skip_silence else None
 
     def _on_seek_complete(self, _=None):
         pass
@@ -49,9 +384,6 @@ class Player:
                 self.audio.seek(0)
                 self.audio.play()
                 self.state = "playing"
-            elif self.shuffle:
-                index = random.randint(0, len(self.songs) - 1)
-                self.play_index(index)
             else:
                 self.next()
             self.update_ui()
@@ -62,6 +394,7 @@ class Player:
         if self.state == "playing":
             self.audio.pause()
             self.state = "paused"
+            self.checkpoint(flush=True)
         else:
             if self.audio.src:
                 try:
@@ -78,78 +411,239 @@ class Player:
             if not (0 <= index < len(self.songs)):
                 return
             self.current_index = index
+            self.queued = None
             song = self.songs[index]
+            if self.order is not None:
+                self.order.select(song.get("file_path"))
+            self._play(song)
+
+    def play_queued(self, song):
+        self.queued = song
+        self._play(song)
+
+    def current_song(self):
+        if self.queued is not None:
+            return self.queued
+        return self.songs[self.current_index] if self.current_index < len(self.songs) else None
+
+    def _play(self, song):
+            if song.get("cloud") and not os.path.exists(song.get("file_path", "")):
+                self._fetch_and_play(song)
+                return
+            if self.standby is not None and self.standby.src == song.get("file_path", ""):
+                self._swap_to_standby()
+            self._apply_analysis(song)
             if self.audio.src != song.get("file_path", ""):
                 self.audio.autoplay = True 
                 self.audio.src = song.get("file_path", "")
                 self.audio.pause()
                 self.audio.update()
             else:
+                self.audio.update()
                 self.audio.play()
+                if self._start_at > 0:
+                    self.audio.seek(int(self._start_at * 1000))
+                self._start_at = 0.0
 
             self.position = 0.0
+            self.duration = float(song.get("duration") or 0)
             self.state = "playing"
             self.update_ui()
+            activity.set_now_playing(song.get("file_path", ""))
+            DbService.mark_played(song.get("file_path", ""))
+            self._preload()
+            self.checkpoint()
+
+    def checkpoint(self, flush=False):
+        song = self.current_song() if self.audio.src else None
+        if song is None or song.get("id") is None:
+            return
+        self.checkpointer.update({
+            "playlist": self.name, "id": song["id"], "position": round(self.position, 1),
+            "shuffle": self.shuffle, "loop": self.loop,
+        })
+        if flush:
+            self.checkpointer.flush()
+
+    def restore(self, song, state):
+        """Loads a checkpointed track paused at its position; the playlist itself is filled in later with set_songs."""
+        self.set_songs([song], state.get("playlist"))
+        self.current_index = 0
+        self.loop = bool(state.get("loop"))
+        self._apply_analysis(song)
+        self._start_at = max(self._start_at, float(state.get("position") or 0))
+        self.position = float(state.get("position") or 0)
+        self.duration = float(song.get("duration") or 0)
+        self.state = "paused"
+        self.audio.autoplay = False
+        self.audio.src = song.get("file_path", "")
+        activity.set_now_playing(self.audio.src)
+
+    def _upcoming_index(self):
+        if not self.songs:
+            return None
+        if self.order is not None:
+            return self._positions.get(self.order.peek_next())
+        return (self.current_index + 1) % len(self.songs)
+
+    def _swap_to_standby(self):
+        previous = self.audio
+        self.audio, self.standby = self.standby, previous
+        previous.pause()
+
+    def _preload(self):
+        if self.standby is None or self.loop:
+            return
+        song = self.queue.peek()
+        if song is None:
+            index = self._upcoming_index()
+            if index is None or (index == self.current_index and self.queued is None):
+                return
+            song = self.songs[index]
+        path = song.get("file_path", "")
+        if not os.path.exists(path):
+            return
+        warm_file(path)
+        activity.set_preloaded(path)
+        if self.standby.src != path:
+            self.standby.autoplay = False
+            self.standby.src = path
+            self.standby.update()
+
+    def _fetch_and_play(self, song):
+        # evicted by the storage quota: fetch it again, then play it if it is still the current track
+        self.audio.pause()
+        self.position = 0.0
+        self.duration = float(song.get("duration") or 0)
+        self.state = "paused"
+        self.update_ui()
+        old_path = song.get("file_path")
+        def on_ready(new_path):
+            if not new_path:
+                return
+            # the extension can change if the download mode did since the eviction
+            self.relocate(old_path, new_path)
+            song["file_path"] = new_path
+            song["cloud"] = False
+            if self.current_song() is song:
+                self._play(song)
+        request_refetch(song, on_ready)
+
+    def enqueue(self, song, play_next=False):
+        if play_next:
+            self.queue.add_next(song)
+        else:
+            self.queue.add(song)
+        self._preload()
+
+    def dequeue(self, song_id):
+        self.queue.remove(song_id)
+        self._preload()
+
+    def clear_queue(self):
+        self.queue.clear()
+        self._preload()
+
+    def move_queued(self, old, new):
+        self.queue.move(old, new)
+        self._preload()
 
     def pause(self):
         self.audio.pause()
         self.state = "paused"
+        self.checkpoint(flush=True)
         self.update_ui()
 
     def next(self,e=None):
+        queued = self.queue.pop()
+        if queued is not None:
+            self.play_queued(queued)
+            self.update_ui()
+            return
         if not self.songs:
             return
-        next_idx = (self.current_index + 1) % len(self.songs)
+        next_idx = self._upcoming_index()
+        if next_idx is None:
+            return
+        if self.order is not None:
+            self.order.advance()
         self.play_index(next_idx)
         self.update_ui()
 
     def previous(self):
         if not self.songs:
             return
-        if self.shuffle:
-            prev_idx = random.randint(0, len(self.songs) - 1)
+        if self.queued is not None:
+            # back from a queued track to where the playlist was
+            self.play_index(self.current_index)
+            return
+        if self.order is not None:
+            # walk back through what this shuffle has played, or restart the track at its start
+            prev_idx = self._positions.get(self.order.peek_previous(), self.current_index)
         else:
             prev_idx = (self.current_index - 1) % len(self.songs)
         self.play_index(prev_idx)
 
     def seek_forward(self, e=None):
         if self.duration <= 0: return
+        activity.hold(2)
         pos = self.audio.get_current_position() / 1000
         new_pos = pos + self.SK
         if new_pos >= self.duration - 0.5:
             self.next()
             return
         self.audio.seek(int(new_pos * 1000))
-        self.update_ui()
+        self.position = new_pos
+        self.on_position()
 
     def seek_backward(self, e=None):
         if self.duration <= 0: return
+        activity.hold(2)
         pos = self.audio.get_current_position() / 1000
         new_pos = max(0, pos - self.SK)
         if new_pos <= 0.5 and self.current_index > 0:
             self.previous()
             return
         self.audio.seek(int(new_pos * 1000))
-        self.update_ui()
+        self.position = new_pos
+        self.on_position()
 
     def toggle_loop(self, e=None):
         self.loop = not self.loop
+        self.checkpoint()
         self.update_ui()
 
     def toggle_shuffle(self, e=None):
         self.shuffle = not self.shuffle
+        if self.shuffle:
+            current = self.songs[self.current_index].get("file_path") if self.current_index < len(self.songs) else None
+            self.order = ShuffleOrder(self._positions, first=current)
+            if self.name is not None:
+                _shuffle_orders[self.name] = self.order
+        else:
+            self.order = None
+            _shuffle_orders.pop(self.name, None)
+        if self.songs:
+            self._preload()
+        self.checkpoint()
         self.update_ui()
         
     def seek_slider(self, e):
         if self.duration > 0 and e.control.value:
+            activity.hold(2)
             ms_position = float(e.control.value)
             self.audio.seek(int(ms_position))
             self.position = ms_position / 1000
-            self.update_ui()
+            self.on_position()
 
     def set_volume(self, e):
         if e.control.value is not None:
-            self.audio.volume = float(e.control.value)
-            DbService.set_setting("volume", str(self.audio.volume))
-
-            self.update_ui()
+            self.base_volume = float(e.control.value)
+            song = self.current_song()
+            if song is not None:
+                self.audio.volume = self._track_volume(song)
+            else:
+                self.audio.volume = self.base_volume
+            DbService.set_setting("volume", str(self.base_volume))
+            # nothing else on screen depends on the volume
+            self.audio.update()
@@ -0,0 +1,59 @@
+import flet as ft
+from source.theme import DARK_ACCENT, TEXT_COLOR, PLAYER_BUTTONS_COLORS
+
+def mini_player(page: ft.Page, player, open_player_view_fn):
+    """A one-line now-playing bar for the main list, driven by the shared playback engine."""
+    title = ft.Text("", size=13, weight=ft.FontWeight.W_500, color=TEXT_COLOR, max_lines=1, overflow=ft.TextOverflow.ELLIPSIS)
+    subtitle = ft.Text("", size=11, color=ft.Colors.GREY)
+    thumb = ft.Container(width=40, height=40, border_radius=4, bgcolor=ft.Colors.ON_SURFACE_VARIANT)
+    progress = ft.ProgressBar(value=0, color=ft.Colors.WHITE, bgcolor=ft.Colors.GREY_800, bar_height=2)
+    play_button = ft.IconButton(icon=ft.Icons.PLAY_ARROW, icon_color=PLAYER_BUTTONS_COLORS, on_click=player.toggle_play)
+
+    def open_player(_):
+        if player.name:
+            open_player_view_fn(player.name)
+
+    bar = ft.Container(
+        content=ft.Column([
+            progress,
+            ft.Row([
+                ft.Container(
+                    content=ft.Row([thumb, ft.Column([title, subtitle], spacing=2, tight=True, expand=True)], spacing=10),
+                    expand=True,
+                    on_click=open_player
+                ),
+                ft.IconButton(icon=ft.Icons.SKIP_PREVIOUS_ROUNDED, icon_color=PLAYER_BUTTONS_COLORS, on_click=lambda _: player.previous()),
+                play_button,
+                ft.IconButton(icon=ft.Icons.SKIP_NEXT_ROUNDED, icon_color=PLAYER_BUTTONS_COLORS, on_click=player.next),
+            ], spacing=4, vertical_alignment=ft.CrossAxisAlignment.CENTER)
+        ], spacing=6, tight=True),
+        padding=ft.padding.symmetric(horizontal=8, vertical=6),
+        border=ft.border.only(top=ft.border.BorderSide(1, ft.Colors.BLACK)),
+        bgcolor=ft.Colors.with_opacity(0.98, ft.Colors.BLACK)
+    )
+
+    def update_position():
+        progress.value = min(1.0, player.position / player.duration) if player.duration else 0
+        progress.update()
+
+    def render():
+        song = player.current_song() if player.audio.src else None
+        bar.visible = song is not None
+        if song is not None:
+            title.value = song["title"]
+            subtitle.value = "Up next" if player.queued is not None else player.name
+            thumb_src = song.get("thumbnail_path")
+            thumb.content = ft.Image(src=thumb_src, width=40, height=40, fit=ft.ImageFit.COVER, border_radius=4) if thumb_src else None
+            thumb.bgcolor = None if thumb_src else ft.Colors.ON_SURFACE_VARIANT
+            playing = player.state == "playing"
+            play_button.icon = ft.Icons.PAUSE_OUTLINED if playing else ft.Icons.PLAY_ARROW
+            play_button.icon_color = DARK_ACCENT if playing else PLAYER_BUTTONS_COLORS
+            progress.value = min(1.0, player.position / player.duration) if player.duration else 0
+
+    def update_ui():
+        render()
+        page.update()
+
+    player.attach(update_ui, update_position)
+    render()
+    return bar
@@ -3,9 +3,14 @@ from ...data.db import DbService
 from source.theme import TEXT_COLOR
 from ...data.utils import format_duration_string
 
+def playlist_subtitle(name, count):
+    total_dur = format_duration_string(DbService.get_playlist_total_duration(name))
+    return f"{count} Tracks, Total Time: {total_dur}"
+
+def update_playlist_tile(tile, name, count):
+    tile.content.subtitle.value = playlist_subtitle(name, count)
+
 def playlist_tile(name, count, thumbnail_path=None, on_edit=None, on_delete=None):
-    total_dur = DbService.get_playlist_total_duration(name)
-    total_dur = format_duration_string(total_dur)
     playlist_items = []
     if on_edit and on_delete:
         playlist_items.append(
@@ -35,7 +40,7 @@ def playlist_tile(name, count, thumbnail_path=None, on_edit=None, on_delete=None
     return ft.Container(
         content=ft.ListTile(
             title=ft.Text(name, color=TEXT_COLOR, size=15, weight=ft.FontWeight.W_600, overflow=ft.TextOverflow.ELLIPSIS),
-            subtitle=ft.Text(f"{count} Tracks, Total Time: {total_dur}", color=ft.Colors.GREY_500, size=12),
+            subtitle=ft.Text(playlist_subtitle(name, count), color=ft.Colors.GREY_500, size=12),
             trailing=trailing_menu,
             content_padding=ft.padding.symmetric(vertical=10, horizontal=0),
             bgcolor=ft.Colors.TRANSPARENT, 
@@ -2,7 +2,7 @@ import flet as ft
 from source.theme import DARK_ACCENT,TEXT_COLOR
 from ..dialogs.settings_dialog import open_settings_dialog
 
-def top_bar_with_settings(on_add_click):
+def top_bar_with_settings(on_add_click, on_import_click=None):
     return ft.Container(
         content=ft.Row(
             [
@@ -32,6 +32,14 @@ def top_bar_with_settings(on_add_click):
                             icon_size=24,
                             on_click=on_add_click
                         ),
+                        ft.IconButton(
+                            icon=ft.Icons.DRIVE_FOLDER_UPLOAD_OUTLINED,
+                            tooltip="Import Folder",
+                            icon_color=DARK_ACCENT,
+                            icon_size=24,
+                            on_click=on_import_click,
+                            visible=on_import_click is not None
+                        ),
                         ft.VerticalDivider(width=1, thickness=1, color=ft.Colors.GREY_700, opacity=0.3),
                         ft.IconButton(
                             icon=ft.Icons.SETTINGS_OUTLINED,
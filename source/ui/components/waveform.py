@@ -0,0 +1,26 @@
+import flet as ft
+import flet.canvas as cv
+
+WAVEFORM_WIDTH = 380
+WAVEFORM_HEIGHT = 28
+WAVEFORM_BARS = 128
+
+def waveform_canvas():
+    return cv.Canvas([], width=WAVEFORM_WIDTH, height=WAVEFORM_HEIGHT)
+
+def draw_waveform(canvas, peaks):
+    """Redraws `canvas` from a (buckets, 2) int8 min/max peak array; None clears it."""
+    if peaks is None:
+        canvas.shapes = []
+        return
+    # fold the stored buckets into as many bars as fit, keeping the extremes
+    group = max(1, len(peaks) // WAVEFORM_BARS)
+    bars = peaks[:group * (len(peaks) // group)].reshape(-1, group, 2)
+    low, high = bars[:, :, 0].min(axis=1), bars[:, :, 1].max(axis=1)
+    middle = WAVEFORM_HEIGHT / 2
+    step = WAVEFORM_WIDTH / len(bars)
+    paint = ft.Paint(color=ft.Colors.with_opacity(0.35, ft.Colors.WHITE), stroke_width=max(1.0, step * 0.6))
+    canvas.shapes = [
+        cv.Line(x, middle - max(1, int(hi)) * middle / 127, x, middle - min(-1, int(lo)) * middle / 127, paint)
+        for x, lo, hi in zip((i * step + step / 2 for i in range(len(bars))), low, high)
+    ]
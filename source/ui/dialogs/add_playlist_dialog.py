@@ -1,7 +1,7 @@
 import flet as ft, threading
 from source.data.db import DbService 
 from source.theme import DARK_ACCENT, TEXT_COLOR
-from source.data.youtube import download_playlist 
+from source.data.downloader import download_playlist, get_download_client
 
 def add_playlist_dialog(on_refresh, page):
     def create_modern_input(label_text):
@@ -64,9 +64,28 @@ def add_playlist_dialog(on_refresh, page):
             progress_bar = ft.ProgressBar(
                 width=350, height=4, value=0, visible=True, color=DARK_ACCENT, bgcolor=ft.Colors.GREY_800
             )
+            def toggle_pause(e):
+                client = get_download_client()
+                if pause_button.text == "Pause":
+                    client.pause_playlist(name)
+                    pause_button.text = "Resume"
+                else:
+                    client.resume_playlist(name)
+                    pause_button.text = "Pause"
+                pause_button.update()
+            def cancel_download(e):
+                get_download_client().cancel_playlist(name)
+                pause_button.disabled = True
+                cancel_button.disabled = True
+                progress_text.value = "Cancelling..."
+                page.update()
+            pause_button = ft.TextButton("Pause", on_click=toggle_pause, style=ft.ButtonStyle(color=ft.Colors.GREY_500))
+            cancel_button = ft.TextButton("Cancel", on_click=cancel_download, style=ft.ButtonStyle(color=ft.Colors.RED_400))
             download_actions_row = ft.Row(
                 [
                     ft.TextButton("Minimize", on_click=minimize_download, style=ft.ButtonStyle(color=ft.Colors.GREY_500)),
+                    pause_button,
+                    cancel_button,
                 ],
                 alignment=ft.MainAxisAlignment.CENTER,
             )
@@ -0,0 +1,74 @@
+import flet as ft, threading
+from source.data.db import DbService
+from source.data.importer import import_folder
+from source.data.progress import ProgressAggregator
+from source.theme import DARK_ACCENT, TEXT_COLOR
+
+def import_folder_dialog(on_refresh, page):
+    import_dialog = ft.AlertDialog(modal=True, content_padding=ft.padding.all(0))
+    progress_text = ft.Text("Scanning folder...", color=TEXT_COLOR, size=16, weight=ft.FontWeight.W_500)
+    progress_bar = ft.ProgressBar(width=350, height=4, value=None, color=DARK_ACCENT, bgcolor=ft.Colors.GREY_800)
+    folder_text = ft.Text("", color=ft.Colors.GREY_400, size=14, weight=ft.FontWeight.W_700, text_align=ft.TextAlign.CENTER)
+
+    def close_dialog(e):
+        import_dialog.open = False
+        page.update()
+
+    close_button = ft.TextButton("Minimize", on_click=close_dialog, style=ft.ButtonStyle(color=ft.Colors.GREY_500))
+
+    def run_import(folder):
+        progress = ProgressAggregator(progress_text, progress_bar, DbService.get_progress_fps()).start()
+        try:
+            import_folder(folder, progress)
+        except Exception as e:
+            progress.set_message(f"Import failed: {e}", 1.0)
+            print(f"Import error: {e}")
+        finally:
+            progress.stop()
+        close_button.text = "Close"
+        page.update()
+        on_refresh()
+
+    def on_folder_picked(e: ft.FilePickerResultEvent):
+        page.overlay.remove(picker)
+        if not e.path:
+            page.update()
+            return
+        folder_text.value = e.path
+        import_dialog.content = ft.Container(
+            content=ft.Column(
+                [
+                    ft.Row(
+                        [
+                            ft.Icon(ft.Icons.DRIVE_FOLDER_UPLOAD_OUTLINED, color=DARK_ACCENT),
+                            ft.Text("Import Folder", color=TEXT_COLOR, size=18, weight=ft.FontWeight.BOLD),
+                        ],
+                        spacing=10
+                    ),
+                    ft.Divider(opacity=0.2, height=10),
+                    folder_text,
+                    ft.Container(height=10),
+                    progress_bar,
+                    progress_text,
+                    ft.Divider(opacity=0.2, height=20),
+                    ft.Row([close_button], alignment=ft.MainAxisAlignment.CENTER),
+                ],
+                spacing=10, tight=True, horizontal_alignment=ft.CrossAxisAlignment.CENTER
+            ),
+            bgcolor=ft.Colors.with_opacity(0.95, ft.Colors.BLACK),
+            border=ft.border.all(2, DARK_ACCENT),
+            border_radius=15,
+            padding=ft.padding.all(25),
+            width=400,
+        )
+        import_dialog.bgcolor = ft.Colors.TRANSPARENT
+        import_dialog.shape = ft.RoundedRectangleBorder(radius=15)
+        page.overlay.append(import_dialog)
+        import_dialog.open = True
+        page.update()
+        threading.Thread(target=run_import, args=(e.path,), daemon=True).start()
+
+    picker = ft.FilePicker(on_result=on_folder_picked)
+    page.overlay.append(picker)
+    page.update()
+    picker.get_directory_path(dialog_title="Choose a music folder to import")
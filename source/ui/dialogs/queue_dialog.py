@@ -0,0 +1,98 @@
+import flet as ft
+from source.theme import DARK_ACCENT, TEXT_COLOR
+from source.data.utils import format_duration
+
+
+def queue_dialog(page: ft.Page, player):
+
+    queue_dialog_ref = ft.AlertDialog(modal=True, content_padding=ft.padding.all(0))
+    queue_list = ft.ReorderableListView(height=360, auto_scroll=False)
+    empty_text = ft.Text("Nothing queued. Use \"Play next\" or \"Add to queue\" on any track.", color=ft.Colors.GREY_400, size=13)
+
+    def close_dialog(e):
+        queue_dialog_ref.open = False
+        page.update()
+
+    def queue_row(song):
+        def remove(_):
+            player.dequeue(song["id"])
+            render()
+
+        def play_now(_):
+            player.dequeue(song["id"])
+            player.play_queued(song)
+            render()
+
+        return ft.Container(
+            key=str(song["id"]),
+            content=ft.Row([
+                ft.Text(song["title"], color=TEXT_COLOR, size=14, overflow=ft.TextOverflow.ELLIPSIS, max_lines=1, expand=True),
+                ft.Text(format_duration(song.get("duration")), color=ft.Colors.GREY, size=12, width=60, text_align=ft.TextAlign.END),
+                ft.IconButton(icon=ft.Icons.PLAY_ARROW, icon_color=ft.Colors.LIGHT_BLUE_100, icon_size=18, on_click=play_now),
+                ft.IconButton(icon=ft.Icons.CLOSE, icon_color=ft.Colors.LIGHT_BLUE_100, icon_size=18, on_click=remove),
+            ], spacing=8, vertical_alignment=ft.CrossAxisAlignment.CENTER),
+            padding=ft.padding.symmetric(horizontal=8, vertical=2),
+        )
+
+    def render():
+        songs = player.queue.songs()
+        queue_list.controls[:] = [queue_row(s) for s in songs]
+        queue_list.visible = bool(songs)
+        empty_text.visible = not songs
+        page.update()
+
+    def on_reorder(e: ft.OnReorderEvent):
+        player.move_queued(e.old_index, e.new_index)
+        render()
+
+    def clear_queue(e):
+        player.clear_queue()
+        render()
+
+    queue_list.on_reorder = on_reorder
+
+    action_buttons = ft.Row(
+        [
+            ft.TextButton("Clear", on_click=clear_queue, style=ft.ButtonStyle(color=ft.Colors.GREY_400, shape=ft.RoundedRectangleBorder(radius=8))),
+            ft.Container(expand=True),
+            ft.TextButton("Close", on_click=close_dialog, style=ft.ButtonStyle(color=ft.Colors.GREY_400, shape=ft.RoundedRectangleBorder(radius=8))),
+        ],
+        alignment=ft.MainAxisAlignment.END,
+    )
+
+    dialog_column_content = ft.Column(
+        [
+            ft.Row(
+                [
+                    ft.Icon(ft.Icons.QUEUE_MUSIC, color=DARK_ACCENT, size=30),
+                    ft.Text("Up Next", size=22, weight=ft.FontWeight.W_700, color=TEXT_COLOR),
+                ],
+                spacing=12
+            ),
+            ft.Divider(opacity=0.2, height=20),
+            empty_text,
+            queue_list,
+            ft.Divider(opacity=0.2, height=30),
+            action_buttons,
+        ],
+        spacing=0,
+        tight=True,
+    )
+
+    final_bordered_content = ft.Container(
+        content=dialog_column_content,
+        bgcolor=ft.Colors.with_opacity(0.95, ft.Colors.BLACK),
+        border=ft.border.all(2, DARK_ACCENT),
+        border_radius=18,
+        padding=ft.padding.all(30),
+        width=520,
+    )
+
+    queue_dialog_ref.content = final_bordered_content
+    queue_dialog_ref.bgcolor = ft.Colors.TRANSPARENT
+    queue_dialog_ref.shape = ft.RoundedRectangleBorder(radius=18)
+    queue_dialog_ref.actions = None
+
+    page.overlay.append(queue_dialog_ref)
+    queue_dialog_ref.open = True
+    render()
@@ -1,12 +1,25 @@
 import flet as ft
 from source.data.db import DbService 
 from source.theme import DARK_ACCENT, TEXT_COLOR
+from source.data.storage import schedule_quota_check
 
 def open_settings_dialog(page):
     current_volume = DbService.get_setting("volume", "0.4")
     current_skip = DbService.get_setting("skip_seconds", "10")
     current_cookies = DbService.get_setting("cookies", "")
     current_performance = DbService.get_setting("performance", "3")
+    current_download_mode = DbService.get_setting("download_mode", "mp3")
+    current_progress_fps = DbService.get_setting("progress_fps", "10")
+    current_position_fps = DbService.get_setting("position_fps", "4")
+    current_fetch_workers = DbService.get_setting("fetch_workers", "3")
+    current_sync_interval = DbService.get_setting("sync_interval_minutes", "60")
+    current_bandwidth_limit = DbService.get_setting("bandwidth_limit_kbps", "0")
+    current_storage_quota = DbService.get_setting("storage_quota_mb", "0")
+    current_split_chapters = DbService.get_setting("split_chapters", "0") == "1"
+    current_normalize_loudness = DbService.get_setting("normalize_loudness", "1") == "1"
+    current_skip_silence = DbService.get_setting("skip_silence", "1") == "1"
+    current_archive_opus = DbService.get_setting("archive_opus", "0") == "1"
+    current_archive_bitrate = DbService.get_setting("archive_bitrate_kbps", "96")
 
     def create_modern_input(label_text, initial_value, keyboard_type=ft.KeyboardType.NUMBER):
         return ft.TextField(
@@ -34,7 +47,28 @@ def open_settings_dialog(page):
         ], spacing=25)
     )
 
+    download_mode_group = ft.RadioGroup(
+        value=current_download_mode,
+        content=ft.Row([
+            ft.Radio(value="mp3", label="MP3 (re-encode)"),
+            ft.Radio(value="native", label="Original (no re-encode)"),
+        ], spacing=25)
+    )
+
+    split_chapters_switch = ft.Switch(label="Split videos into tracks by chapter", value=current_split_chapters, active_color=DARK_ACCENT)
+
+    normalize_loudness_switch = ft.Switch(label="Even out loudness between tracks", value=current_normalize_loudness, active_color=DARK_ACCENT)
+    skip_silence_switch = ft.Switch(label="Skip silent intros and outros", value=current_skip_silence, active_color=DARK_ACCENT)
+    archive_opus_switch = ft.Switch(label="Re-encode library to Opus when idle", value=current_archive_opus, active_color=DARK_ACCENT)
+    archive_bitrate_input = create_modern_input("Opus Bitrate (kbps)", str(current_archive_bitrate), keyboard_type=ft.KeyboardType.NUMBER)
+
     skip_input = create_modern_input("Skip/Rewind Seconds", str(current_skip), keyboard_type=ft.KeyboardType.NUMBER)
+    progress_fps_input = create_modern_input("Download Progress Updates per Second", str(current_progress_fps), keyboard_type=ft.KeyboardType.NUMBER)
+    position_fps_input = create_modern_input("Seek Bar Updates per Second", str(current_position_fps), keyboard_type=ft.KeyboardType.NUMBER)
+    fetch_workers_input = create_modern_input("Parallel Downloads", str(current_fetch_workers), keyboard_type=ft.KeyboardType.NUMBER)
+    sync_interval_input = create_modern_input("Playlist Sync Interval (minutes, 0 = off)", str(current_sync_interval), keyboard_type=ft.KeyboardType.NUMBER)
+    bandwidth_limit_input = create_modern_input("Bandwidth Limit (KB/s, 0 = unlimited)", str(current_bandwidth_limit), keyboard_type=ft.KeyboardType.NUMBER)
+    storage_quota_input = create_modern_input("Storage Quota (MB, 0 = unlimited)", str(current_storage_quota), keyboard_type=ft.KeyboardType.NUMBER)
     cookies_input = create_modern_input("YouTube Cookies (Optional)", current_cookies, keyboard_type=ft.KeyboardType.TEXT)
     
     final_volume = int(float(current_volume) * 100)
@@ -66,15 +100,49 @@ def open_settings_dialog(page):
             if skip_value <= 0:
                 raise ValueError("Skip seconds must be positive.")
             DbService.set_setting("skip_seconds", str(skip_value))
+            progress_fps = int(progress_fps_input.value)
+            if progress_fps <= 0:
+                raise ValueError("Progress updates per second must be positive.")
+            DbService.set_setting("progress_fps", str(progress_fps))
+            position_fps = int(position_fps_input.value)
+            if position_fps <= 0:
+                raise ValueError("Seek bar updates per second must be positive.")
+            DbService.set_setting("position_fps", str(position_fps))
+            fetch_workers = int(fetch_workers_input.value)
+            if fetch_workers <= 0:
+                raise ValueError("Parallel downloads must be positive.")
+            DbService.set_setting("fetch_workers", str(fetch_workers))
+            sync_interval = int(sync_interval_input.value)
+            if sync_interval < 0:
+                raise ValueError("Sync interval cannot be negative.")
+            DbService.set_setting("sync_interval_minutes", str(sync_interval))
+            bandwidth_limit = int(bandwidth_limit_input.value)
+            if bandwidth_limit < 0:
+                raise ValueError("Bandwidth limit cannot be negative.")
+            DbService.set_setting("bandwidth_limit_kbps", str(bandwidth_limit))
+            storage_quota = int(storage_quota_input.value)
+            if storage_quota < 0:
+                raise ValueError("Storage quota cannot be negative.")
+            DbService.set_setting("storage_quota_mb", str(storage_quota))
+            schedule_quota_check()
+            archive_bitrate = int(archive_bitrate_input.value)
+            if not 24 <= archive_bitrate <= 256:
+                raise ValueError("Opus bitrate must be between 24 and 256 kbps.")
+            DbService.set_setting("archive_bitrate_kbps", str(archive_bitrate))
+            DbService.set_setting("archive_opus", "1" if archive_opus_switch.value else "0")
+            DbService.set_setting("normalize_loudness", "1" if normalize_loudness_switch.value else "0")
+            DbService.set_setting("skip_silence", "1" if skip_silence_switch.value else "0")
             DbService.set_setting("volume", str(float(volume_input.value)))
             
             DbService.set_setting("cookies", cookies_input.value)
+            DbService.set_setting("download_mode", download_mode_group.value)
+            DbService.set_setting("split_chapters", "1" if split_chapters_switch.value else "0")
             
             close(e)
             page.snack_bar = ft.SnackBar(ft.Text("Settings saved successfully!"), open=True)
             page.update()
         except ValueError:
-            page.snack_bar = ft.SnackBar(ft.Text("Invalid input: Skip Seconds must be a positive whole number."), open=True)
+            page.snack_bar = ft.SnackBar(ft.Text("Invalid input: Skip Seconds, Progress Updates, Seek Bar Updates, Parallel Downloads, Sync Interval, Bandwidth Limit, Storage Quota and Opus Bitrate (24-256) must be whole numbers."), open=True)
             page.update()
         except Exception as ex:
             print(f"Error saving settings: {ex}")
@@ -160,18 +228,41 @@ def open_settings_dialog(page):
             volume_input,
             ft.Container(height=10),
             skip_input,
+            ft.Container(height=10),
+            normalize_loudness_switch,
+            skip_silence_switch,
             
             # --- Performance Section (New) ---
             ft.Divider(opacity=0.2, height=20),
             ft.Text("Performance & Resources", color=ft.Colors.GREY_400, size=14, weight=ft.FontWeight.W_600),
             ft.Container(height=10),
             performance_group,
+            ft.Container(height=10),
+            progress_fps_input,
+            ft.Container(height=10),
+            position_fps_input,
+            ft.Container(height=10),
+            fetch_workers_input,
             
             # --- YouTube Section ---
             ft.Divider(opacity=0.2, height=20),
             ft.Text("YouTube", color=ft.Colors.GREY_400, size=14, weight=ft.FontWeight.W_600),
             ft.Container(height=10),
             cookies_input,
+            ft.Container(height=10),
+            sync_interval_input,
+            ft.Container(height=10),
+            bandwidth_limit_input,
+            ft.Container(height=10),
+            storage_quota_input,
+            ft.Container(height=10),
+            archive_opus_switch,
+            archive_bitrate_input,
+            ft.Container(height=10),
+            ft.Text("Download Format", color=TEXT_COLOR, weight=ft.FontWeight.W_200),
+            download_mode_group,
+            ft.Container(height=10),
+            split_chapters_switch,
             
             # --- Action Buttons ---
             ft.Divider(opacity=0.2, height=30),
@@ -1,14 +1,22 @@
 import flet as ft
 from source.data.db import DbService
-from ..components.playlist_tile import playlist_tile
+from source.data import events
+from source.data.downloader import get_download_client
+from .player_view import cached_playlist_data
+from ..components.playlist_tile import playlist_tile, update_playlist_tile
 from ..components.top_bar import top_bar_with_settings
+from ..components.mini_player import mini_player
 from ..dialogs.add_playlist_dialog import add_playlist_dialog
 from ..dialogs.edit_playlist_dialog import edit_playlist_dialog
+from ..dialogs.import_folder_dialog import import_folder_dialog
 
-def get_main_list_view(page: ft.Page, open_player_view_fn): 
+def get_main_list_view(page: ft.Page, open_player_view_fn, player): 
     playlists_column = ft.Column(spacing=10)
+    tiles = {}
+    counts = {}
     def refresh_playlists():
         playlists_column.controls.clear()
+        tiles.clear()
         favourite_paths = DbService.get_favourites() 
         num_favourites = len(favourite_paths)
         if num_favourites > 0:
@@ -23,12 +31,14 @@ def get_main_list_view(page: ft.Page, open_player_view_fn):
                 on_delete=None
             )
             fav_tile.on_click = lambda e: open_player_view_fn("Favourites")
+            tiles[events.FAVOURITES] = fav_tile
+            counts[events.FAVOURITES] = num_favourites
             playlists_column.controls.append(fav_tile)
         for name, count in DbService.get_playlists(): 
             playlist_thumb_path = None
             display_name = name
             if count > 0:
-                videos = DbService.get_playlist_data(name)
+                videos = cached_playlist_data(name)
                 playlist_thumb_path = videos[0]["thumbnail_path"] if videos else None
             tile = playlist_tile(
                 display_name,
@@ -38,10 +48,33 @@ def get_main_list_view(page: ft.Page, open_player_view_fn):
                 on_delete=lambda e, n=name: delete_playlist(n)
             )
             tile.on_click = lambda e, n=name: open_player_view_fn(n)
+            tiles[name] = tile
+            counts[name] = count
             playlists_column.controls.append(tile)
         page.update()
+    def set_count(name, count):
+        tile = tiles.get(name)
+        if tile is None:
+            return
+        counts[name] = count
+        update_playlist_tile(tile, name, count)
+        try:
+            tile.update()
+        except Exception:
+            pass
+    def on_track_added(name, file_path):
+        if name in counts:
+            set_count(name, counts[name] + 1)
+    def on_data_event(event):
+        # additions are counted by on_track_added, dialogs refresh the list themselves
+        if event.kind == events.TRACK_REMOVED and event.playlist in counts:
+            set_count(event.playlist, counts[event.playlist] - 1)
+        elif event.kind == events.FAVOURITE_TOGGLED and events.FAVOURITES in counts:
+            set_count(events.FAVOURITES, len(DbService.get_favourites()))
     def open_add_dialog(e):
         add_playlist_dialog(on_refresh=refresh_playlists, page=page)
+    def open_import_dialog(e):
+        import_folder_dialog(on_refresh=refresh_playlists, page=page)
     def open_edit_dialoge(name):
         edit_playlist_dialog(name, on_refresh=refresh_playlists, page=page)
     def delete_playlist(name):
@@ -72,7 +105,10 @@ def get_main_list_view(page: ft.Page, open_player_view_fn):
         )
         page.open(banner)
     refresh_playlists() 
+    get_download_client().set_track_listener("main_list", on_track_added)
+    events.subscribe("main_list", on_data_event)
     return [
-        top_bar_with_settings(on_add_click=open_add_dialog),
-        ft.Container(content=playlists_column, expand=True, padding=ft.padding.only(top=10))
+        top_bar_with_settings(on_add_click=open_add_dialog, on_import_click=open_import_dialog),
+        ft.Container(content=playlists_column, expand=True, padding=ft.padding.only(top=10)),
+        mini_player(page, player, open_player_view_fn)
     ]
\ No newline at end of file
@@ -1,27 +1,48 @@
 import flet as ft
-import flet_audio as fa
 from concurrent.futures import ThreadPoolExecutor, Future
 from functools import lru_cache
 
-from ..audio_player import Player
 from source.data.db import DbService
 from source.theme import DARK_ACCENT
 from source.data.utils import format_duration
+from source.data.storage import request_refetch
+from source.data import events
+from source.data.features import build_radio
+from source.data.peaks import read_peaks
 from source.ui.dialogs.edit_song_dialog import edit_song_dialog
+from source.ui.dialogs.queue_dialog import queue_dialog
 from source.ui.components.buttons import getButtons, updateButtons
+from source.ui.components.waveform import waveform_canvas, draw_waveform, WAVEFORM_WIDTH, WAVEFORM_HEIGHT
 
 workers = DbService.get_performance_workers()
 EXECUTOR = ThreadPoolExecutor(max_workers=workers)
 
 @lru_cache(maxsize=16)
-def cached_playlist_data(name: str):
+def _playlist_data(name: str, version):
     return DbService.get_playlist_data(name)
 
+def cached_playlist_data(name: str):
+    # any change to the playlist bumps its version, so a stale entry is never looked up again
+    return _playlist_data(name, events.version(name))
+
+
+TILE_ANIMATION = ft.Animation(duration=300, curve=ft.AnimationCurve.EASE)
+CHOSEN_COLOR = ft.Colors.with_opacity(0.09, ft.Colors.WHITE70)
+ROW_HEIGHT = 60
+ROW_EXTENT = 62
+WINDOW_BUFFER = 20
+RADIO_PREFIX = "Radio: "
 
-def get_player_view(page: ft.Page, playlist_name: str, open_main_list_view_fn):
-    skip_seconds = int(DbService.get_setting("skip_seconds", 10))
-    songs = cached_playlist_data(playlist_name)
-    audio = fa.Audio(volume=float(DbService.get_setting("volume", 0.4)))
+def get_player_view(page: ft.Page, playlist_name: str, open_main_list_view_fn, player):
+    # the list this view shows; the engine only switches to it when a track from it is played
+    list_name = playlist_name
+    if player.name == playlist_name:
+        songs = player.songs
+    else:
+        songs = cached_playlist_data(playlist_name)
+
+    def owns_player():
+        return player.name == list_name
 
     is_favourites_playlist = (playlist_name == "Favourites")
 
@@ -32,12 +53,13 @@ def get_player_view(page: ft.Page, playlist_name: str, open_main_list_view_fn):
     initial_duration_ms = 1000
     initial_duration_str = "00:00"
 
-    if songs:
-        first_song = songs[0]
+    now_playing = player.current_song() if player.audio.src else None
+    if now_playing or songs:
+        first_song = now_playing or songs[0]
         initial_song_title = first_song.get("title", "Unknown Title")
-        initial_playlist_text = playlist_name
+        initial_playlist_text = player.name if now_playing else playlist_name
         
-        duration_s = first_song.get("duration", 0)
+        duration_s = first_song.get("duration") or 0
         initial_duration_ms = max(1, duration_s * 1000)
         initial_duration_str = format_duration(duration_s)
         
@@ -73,21 +95,57 @@ def get_player_view(page: ft.Page, playlist_name: str, open_main_list_view_fn):
     position_text = ft.Text(initial_position_str, color=ft.Colors.GREY, size=10, width=50, text_align=ft.TextAlign.LEFT)
     duration_text = ft.Text(initial_duration_str, color=ft.Colors.GREY, size=10, width=50, text_align=ft.TextAlign.RIGHT)
     
-    progress_slider = ft.Slider(min=0, max=initial_duration_ms, divisions=1000, active_color=ft.Colors.WHITE, inactive_color=ft.Colors.GREY_600, thumb_color=ft.Colors.with_opacity(0.5, ft.Colors.WHITE12), expand=True, height=4)
+    progress_slider = ft.Slider(min=0, max=initial_duration_ms, divisions=1000, active_color=ft.Colors.WHITE, inactive_color=ft.Colors.GREY_600, thumb_color=ft.Colors.with_opacity(0.5, ft.Colors.WHITE12), width=WAVEFORM_WIDTH, height=4)
+    # the seek bar sits on the track's precomputed waveform, redrawn only when the track changes
+    waveform = waveform_canvas()
+    waveform_song_id = None
+    seek_bar = ft.Stack([waveform, ft.Container(progress_slider, alignment=ft.alignment.center, height=WAVEFORM_HEIGHT)], width=WAVEFORM_WIDTH, height=WAVEFORM_HEIGHT)
     
-    volume_slider = ft.Slider(min=0, max=1, divisions=20, value=audio.volume, active_color=ft.Colors.WHITE, inactive_color=ft.Colors.GREY_700, width=140, height=8, thumb_color=ft.Colors.TRANSPARENT)
+    volume_slider = ft.Slider(min=0, max=1, divisions=20, value=player.base_volume, active_color=ft.Colors.WHITE, inactive_color=ft.Colors.GREY_700, width=140, height=8, thumb_color=ft.Colors.TRANSPARENT)
     shuffle_icon = ft.Icon(ft.Icons.SHUFFLE_OUTLINED, color=ft.Colors.GREY_500, size=18)
     loop_icon = ft.Icon(ft.Icons.REPEAT_ONE_OUTLINED, color=ft.Colors.GREY_500, size=18)
 
     songs_list_control = None
+    # only the rows around the viewport exist as controls; the rest of the list is
+    # list padding of the same height. Rows are recycled: scrolling rebinds them.
+    window = [0, 0]
+    highlighted = None
 
     def go_back():
-        audio.pause()
-        audio.release()
+        # playback carries on; the main list's mini-player takes over the engine
+        events.subscribe("player_view", None)
         open_main_list_view_fn()
 
+    def update_position():
+        # the fast path for position ticks: touch only the seek bar and its label
+        position_text.value = format_duration(player.position)
+        progress_slider.max = player.duration * 1000 if player.duration and player.duration > 0 else 1000
+        progress_slider.value = min(player.position * 1000, progress_slider.max)
+        position_text.update()
+        progress_slider.update()
+
+    def show_waveform(song):
+        nonlocal waveform_song_id
+        song_id = song.get("id") if song else None
+        if song_id == waveform_song_id:
+            return
+        waveform_song_id = song_id
+        draw_waveform(waveform, read_peaks(song.get("peaks_row")) if song else None)
+        progress_slider.inactive_color = ft.Colors.TRANSPARENT if waveform.shapes else ft.Colors.GREY_600
+
+    def move_highlight(target):
+        # only the previously and newly chosen rows change colour
+        nonlocal highlighted
+        if target == highlighted:
+            return
+        for list_index, colour in ((highlighted, ft.Colors.TRANSPARENT), (target, CHOSEN_COLOR)):
+            if list_index is not None and window[0] <= list_index < window[1]:
+                songs_list_control.controls[list_index - window[0]].bgcolor = colour
+        highlighted = target
+
     def update_ui():
-        if not player.songs:
+        show_waveform(player.current_song())
+        if player.current_song() is None:
             current_song_text.value = "No track playing"
             current_playlist_text.value = "Select a song"
             position_text.value = "00:00" 
@@ -100,12 +158,11 @@ def get_player_view(page: ft.Page, playlist_name: str, open_main_list_view_fn):
             page.update()
             return
 
-        idx = player.current_index
-        song = player.songs[idx] if idx < len(player.songs) else None
+        song = player.current_song()
 
         if song:
             current_song_text.value = song["title"]
-            current_playlist_text.value = playlist_name
+            current_playlist_text.value = "Up next" if player.queued is not None else player.name
             
             position_text.value = format_duration(player.position)
 
@@ -138,106 +195,264 @@ def get_player_view(page: ft.Page, playlist_name: str, open_main_list_view_fn):
 
         shuffle_icon.color = DARK_ACCENT if player.shuffle else ft.Colors.GREY_500
         loop_icon.color = DARK_ACCENT if player.loop else ft.Colors.GREY_500
-        chosen = ft.Colors.with_opacity(0.09 , ft.Colors.WHITE70)
-        unchosen = ft.Colors.TRANSPARENT
-        for i, ctrl in enumerate(songs_list_control.controls):
-            ctrl:ft.Container
-            ctrl.bgcolor = chosen if i == player.current_index else unchosen
-            ctrl.animate = ft.Animation(duration=300, curve=ft.AnimationCurve.EASE)
+        move_highlight(player.current_index if owns_player() and player.queued is None else None)
 
         updateButtons(PlayerButtons, player)
         page.update()
 
-    player = Player(audio, songs, update_ui, skip_seconds)
+    player.attach(update_ui, update_position)
     progress_slider.on_change = player.seek_slider
     volume_slider.on_change = player.set_volume
 
-    def song_tile(song, list_index):
-        display_index = list_index + 1
-        is_fav = song["file_path"] in DbService.get_favourites()
-        star_icon = ft.Icons.STAR if is_fav else ft.Icons.STAR_OUTLINE
-        def toggle_favourite(_):
-            def on_toggle_complete(future: Future):
-                try:
-                    future.result()
-                    cached_playlist_data.cache_clear()
-                    if is_favourites_playlist:
-                        updated_songs = DbService.get_playlist_data("Favourites")
-                        if not updated_songs:
-                            page.run_thread(go_back)
-                            return
-                    page.run_thread(refresh_songs)
-                except Exception as e:
-                    print(f"Error toggling favourite: {e}")
-                    page.run_thread(refresh_songs)
-
-            future_toggle = EXECUTOR.submit(DbService.toggle_favourite, song["file_path"])
-            future_toggle.add_done_callback(on_toggle_complete)
-
-        def delete_song(_):
-            def after_delete(future: Future):
-                try:
-                    future.result()
-                    new_songs = DbService.get_playlist_data(playlist_name)
-                    
-                    if not new_songs and is_favourites_playlist:
-                        page.run_thread(go_back)
-                    else:
-                        page.run_thread(refresh_songs)
-                except Exception as e:
-                    print(f"Error deleting song: {e}")
-                    page.run_thread(refresh_songs)
-
-            future_delete = EXECUTOR.submit(DbService.delete_song, song["file_path"])
-            future_delete.add_done_callback(after_delete)
-
-        def edit_song(_):
-            edit_song_dialog(page, song["file_path"], refresh_songs)
-
-        def play_song(_):
-            for i, c in enumerate(songs_list_control.controls):
-                if c.key == song["file_path"]:
-                    player.play_index(i)
-                    break
+    viewport_rows = int((page.height or 900) // ROW_EXTENT) + 1
+    row_pool = []
+    row_parts = {}
+    # (kind, file_path) of bus events caused by this view, whose rows are already patched
+    own_edits = set()
+    refresh_pending = False
+
+    def saved(future: Future, *edits):
+        # DbService reports a failed write by its return value and publishes nothing for it
+        if not future.result():
+            own_edits.difference_update(edits)
+            raise RuntimeError("the change was not saved")
+
+    def index_of(song):
+        if owns_player():
+            return player.index_of(song["file_path"])
+        return next((i for i, s in enumerate(songs) if s["file_path"] == song["file_path"]), None)
+
+    def patch_row(song):
+        # one song's data changed: rebind its row if it is rendered, nothing else
+        list_index = index_of(song)
+        if list_index is not None and window[0] <= list_index < window[1]:
+            row = songs_list_control.controls[list_index - window[0]]
+            bind_row(row, list_index)
+            row.update()
+
+    def remove_row(song):
+        list_index = index_of(song)
+        if list_index is None:
+            return
+        if owns_player():
+            player.remove_song(list_index)
+        else:
+            songs.pop(list_index)
+        if is_favourites_playlist and not songs:
+            go_back()
+            return
+        track_count.value = f"{len(songs)} tracks"
+        # rows above the removed one keep their values, so rebinding them sends nothing
+        render_window(window[0] + WINDOW_BUFFER if window[0] else 0)
+        update_ui()
 
-        thumb_src = song.get("thumbnail_path")
-        thumb = ft.Container(
-            content=ft.Image(src=thumb_src, width=44, height=44, fit=ft.ImageFit.COVER, border_radius=6) if thumb_src else None,
-            width=44,
-            height=44,
-            border_radius=6,
-            bgcolor=None if thumb_src else ft.Colors.ON_SURFACE_VARIANT
-        )
+    def toggle_favourite(song):
+        def on_toggle_complete(future: Future):
+            try:
+                saved(future, (events.FAVOURITE_TOGGLED, song["file_path"]))
+                song["is_favourite"] = not song.get("is_favourite")
+                if is_favourites_playlist and not song["is_favourite"]:
+                    page.run_thread(lambda: remove_row(song))
+                else:
+                    page.run_thread(lambda: patch_row(song))
+            except Exception as e:
+                print(f"Error toggling favourite: {e}")
+                own_edits.discard((events.FAVOURITE_TOGGLED, song["file_path"]))
+                page.run_thread(refresh_songs)
+
+        own_edits.add((events.FAVOURITE_TOGGLED, song["file_path"]))
+        future_toggle = EXECUTOR.submit(DbService.toggle_favourite, song["file_path"])
+        future_toggle.add_done_callback(on_toggle_complete)
 
-        return ft.Container(
-            key=song["file_path"],
-            content=ft.Row([
-                ft.Row([ft.Text(str(display_index), color=ft.Colors.GREY, size=12, width=20, text_align=ft.TextAlign.CENTER), thumb],
-                       spacing=6, vertical_alignment=ft.CrossAxisAlignment.CENTER),
-                ft.Text(song["title"], color=ft.Colors.WHITE, size=14, weight=ft.FontWeight.W_500, overflow=ft.TextOverflow.ELLIPSIS, max_lines=1, expand=True),
-                ft.Row([
-                    ft.Text(format_duration(song["duration"]), color=ft.Colors.GREY, size=12, width=60, text_align=ft.TextAlign.END),
-                    ft.IconButton(icon=star_icon, icon_color=ft.Colors.LIGHT_BLUE_100, on_click=toggle_favourite),
-                    ft.PopupMenuButton(
-                        icon=ft.Icons.MORE_VERT, icon_color=ft.Colors.LIGHT_BLUE_100,
-                        items=[
-                            ft.PopupMenuItem(content=ft.Row([ft.Icon(ft.Icons.EDIT_NOTE), ft.Text("Edit")], spacing=5), on_click=edit_song),
-                            ft.PopupMenuItem(content=ft.Row([ft.Icon(ft.Icons.DELETE_FOREVER), ft.Text("Delete")], spacing=5), on_click=delete_song)
-                        ])
-                ], spacing=8, vertical_alignment=ft.CrossAxisAlignment.CENTER)
-            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN, spacing=12),
+    def delete_song(song):
+        def after_delete(future: Future):
+            try:
+                saved(future, *edits)
+                page.run_thread(lambda: remove_row(song))
+            except Exception as e:
+                print(f"Error deleting song: {e}")
+                own_edits.difference_update(edits)
+                page.run_thread(refresh_songs)
+
+        edits = {(events.TRACK_REMOVED, song["file_path"])}
+        if song.get("is_favourite"):
+            edits.add((events.FAVOURITE_TOGGLED, song["file_path"]))
+        own_edits.update(edits)
+        future_delete = EXECUTOR.submit(DbService.delete_song, song["file_path"])
+        future_delete.add_done_callback(after_delete)
+
+    def reload_song(song):
+        # reload just this song and patch its row
+        def on_song_ready(future: Future):
+            try:
+                updated = future.result()
+            except Exception as e:
+                print(f"Error reloading song: {e}")
+                updated = []
+            if updated:
+                song["title"] = updated[0]["title"]
+                page.run_thread(lambda: (patch_row(song), update_ui()))
+        EXECUTOR.submit(DbService.get_songs_by_ids, [song["id"]]).add_done_callback(on_song_ready)
+
+    def edit_song(song):
+        # the rename comes back as a TRACK_RENAMED event, which reloads the row
+        edit_song_dialog(page, song["file_path"], lambda: None)
+
+    def play_similar(song):
+        def on_radio_ready(future: Future):
+            try:
+                radio = future.result()
+            except Exception as e:
+                print(f"Error building radio: {e}")
+                radio = []
+            if len(radio) < 2:
+                page.snack_bar = ft.SnackBar(ft.Text("This track has not been analysed yet, try again later."), open=True)
+                page.update()
+                return
+            page.run_thread(lambda: start_radio(song, radio))
+
+        future_radio = EXECUTOR.submit(build_radio, song["id"])
+        future_radio.add_done_callback(on_radio_ready)
+
+    def add_to_queue(song, play_next):
+        player.enqueue(song, play_next)
+        page.snack_bar = ft.SnackBar(ft.Text(f"'{song['title']}' will play next." if play_next else f"Added '{song['title']}' to the queue."), open=True)
+        page.update()
+
+    def toggle_pin(song):
+        def on_pin_complete(future: Future):
+            try:
+                saved(future, (events.PLAYLIST_CHANGED, song["file_path"]))
+                # a pinned track is meant to be available offline
+                if song.get("cloud") and not song.get("pinned"):
+                    old_path = song["file_path"]
+                    def on_refetched(new_path):
+                        if new_path:
+                            # the engine keys tracks by path; it rekeys its own copy first
+                            player.relocate(old_path, new_path)
+                            song["file_path"] = new_path
+                            song["cloud"] = False
+                        page.run_thread(lambda: patch_row(song))
+                    request_refetch(song, on_refetched)
+                song["pinned"] = not song.get("pinned")
+                page.run_thread(lambda: patch_row(song))
+            except Exception as e:
+                print(f"Error pinning song: {e}")
+                own_edits.discard((events.PLAYLIST_CHANGED, song["file_path"]))
+                page.run_thread(refresh_songs)
+
+        own_edits.add((events.PLAYLIST_CHANGED, song["file_path"]))
+        future_pin = EXECUTOR.submit(DbService.toggle_pinned, song["file_path"])
+        future_pin.add_done_callback(on_pin_complete)
+
+    def play_song(list_index):
+        if not owns_player():
+            player.set_songs(songs, list_name)
+        player.play_index(list_index)
+
+    def make_row():
+        # handlers read the row's current index at click time, so a recycled row needs no new closures
+        row = ft.Container(
+            height=ROW_HEIGHT,
             padding=ft.padding.symmetric(horizontal=16, vertical=8),
-            margin=ft.margin.only(bottom=2),
+            margin=ft.margin.only(bottom=ROW_EXTENT - ROW_HEIGHT),
             border_radius=6,
             bgcolor=ft.Colors.TRANSPARENT,
-            on_click=play_song
+            animate=TILE_ANIMATION,
         )
+        def on(action):
+            return lambda _: action(songs[row.data]) if row.data is not None and row.data < len(songs) else None
+        index_text = ft.Text("", color=ft.Colors.GREY, size=12, width=20, text_align=ft.TextAlign.CENTER)
+        thumb = ft.Container(width=44, height=44, border_radius=6)
+        title = ft.Text("", color=ft.Colors.WHITE, size=14, weight=ft.FontWeight.W_500, overflow=ft.TextOverflow.ELLIPSIS, max_lines=1, expand=True)
+        cloud_icon = ft.Icon(ft.Icons.CLOUD_OUTLINED, color=ft.Colors.GREY, size=16, tooltip="Not on disk, downloads when played")
+        duration = ft.Text("", color=ft.Colors.GREY, size=12, width=60, text_align=ft.TextAlign.END)
+        star = ft.IconButton(icon=ft.Icons.STAR_OUTLINE, icon_color=ft.Colors.LIGHT_BLUE_100, on_click=on(toggle_favourite))
+        pin_text = ft.Text("")
+        row.content = ft.Row([
+            ft.Row([index_text, thumb], spacing=6, vertical_alignment=ft.CrossAxisAlignment.CENTER),
+            title,
+            ft.Row([
+                cloud_icon,
+                duration,
+                star,
+                ft.PopupMenuButton(
+                    icon=ft.Icons.MORE_VERT, icon_color=ft.Colors.LIGHT_BLUE_100,
+                    items=[
+                        ft.PopupMenuItem(content=ft.Row([ft.Icon(ft.Icons.EDIT_NOTE), ft.Text("Edit")], spacing=5), on_click=on(edit_song)),
+                        ft.PopupMenuItem(content=ft.Row([ft.Icon(ft.Icons.PLAYLIST_PLAY), ft.Text("Play next")], spacing=5), on_click=on(lambda song: add_to_queue(song, True))),
+                        ft.PopupMenuItem(content=ft.Row([ft.Icon(ft.Icons.QUEUE_MUSIC), ft.Text("Add to queue")], spacing=5), on_click=on(lambda song: add_to_queue(song, False))),
+                        ft.PopupMenuItem(content=ft.Row([ft.Icon(ft.Icons.RADIO), ft.Text("Play similar")], spacing=5), on_click=on(play_similar)),
+                        ft.PopupMenuItem(content=ft.Row([ft.Icon(ft.Icons.PUSH_PIN_OUTLINED), pin_text], spacing=5), on_click=on(toggle_pin)),
+                        ft.PopupMenuItem(content=ft.Row([ft.Icon(ft.Icons.DELETE_FOREVER), ft.Text("Delete")], spacing=5), on_click=on(delete_song))
+                    ])
+            ], spacing=8, vertical_alignment=ft.CrossAxisAlignment.CENTER)
+        ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN, spacing=12)
+        row.on_click = lambda _: play_song(row.data) if row.data is not None and row.data < len(songs) else None
+        row_parts[row] = (index_text, thumb, title, cloud_icon, duration, star, pin_text)
+        return row
+
+    def bind_row(row, list_index):
+        song = songs[list_index]
+        index_text, thumb, title, cloud_icon, duration, star, pin_text = row_parts[row]
+        row.key = song["file_path"]
+        row.data = list_index
+        index_text.value = str(list_index + 1)
+        thumb_src = song.get("thumbnail_path")
+        if thumb_src:
+            if isinstance(thumb.content, ft.Image):
+                thumb.content.src = thumb_src
+            else:
+                thumb.content = ft.Image(src=thumb_src, width=44, height=44, fit=ft.ImageFit.COVER, border_radius=6)
+            thumb.bgcolor = None
+        else:
+            thumb.content = None
+            thumb.bgcolor = ft.Colors.ON_SURFACE_VARIANT
+        title.value = song["title"]
+        cloud_icon.visible = bool(song.get("cloud"))
+        duration.value = format_duration(song["duration"])
+        star.icon = ft.Icons.STAR if song.get("is_favourite") else ft.Icons.STAR_OUTLINE
+        pin_text.value = "Unpin" if song.get("pinned") else "Pin (keep on disk)"
+        row.bgcolor = CHOSEN_COLOR if list_index == highlighted else ft.Colors.TRANSPARENT
+
+    def render_window(first_visible=None):
+        if first_visible is None:
+            first_visible = window[0] + WINDOW_BUFFER if window[0] else 0
+        count = len(songs)
+        start = max(0, min(first_visible, count) - WINDOW_BUFFER)
+        end = min(count, first_visible + viewport_rows + WINDOW_BUFFER)
+        while len(row_pool) < end - start:
+            row_pool.append(make_row())
+        rows = row_pool[:end - start]
+        for offset, row in enumerate(rows):
+            bind_row(row, start + offset)
+        songs_list_control.controls[:] = rows
+        songs_list_control.padding = ft.padding.only(top=start * ROW_EXTENT, bottom=(count - end) * ROW_EXTENT)
+        window[:] = [start, end]
+
+    def on_scroll(e: ft.OnScrollEvent):
+        nonlocal viewport_rows
+        if e.pixels is None:
+            return
+        first = int(e.pixels // ROW_EXTENT)
+        if e.viewport_dimension:
+            viewport_rows = int(e.viewport_dimension // ROW_EXTENT) + 1
+        start, end = window
+        # shift the window once the viewport gets within half a buffer of its edges
+        if (start > 0 and first - WINDOW_BUFFER // 2 < start) or (end < len(songs) and first + viewport_rows + WINDOW_BUFFER // 2 > end):
+            render_window(first)
+            update_ui()
 
     def refresh_songs(new_name=None):
-        nonlocal playlist_name, is_favourites_playlist
+        nonlocal playlist_name, is_favourites_playlist, refresh_pending
+        refresh_pending = False
         if new_name:
             playlist_name = new_name
             is_favourites_playlist = (playlist_name == "Favourites")
+        if playlist_name.startswith(RADIO_PREFIX):
+            # a radio reopened from the mini-player has no playlist to reload
+            finalize_refresh(songs)
+            return
         playlist_title.value = playlist_name
 
         future_data: Future = EXECUTOR.submit(DbService.get_playlist_data, playlist_name)
@@ -253,32 +468,87 @@ def get_player_view(page: ft.Page, playlist_name: str, open_main_list_view_fn):
         future_data.add_done_callback(on_data_ready)
 
     def finalize_refresh(new_songs):
-        player.songs = new_songs
-        track_count.value = f"{len(player.songs)} tracks"
-        songs_list_control.controls[:] = [song_tile(s, i) for i, s in enumerate(player.songs)]
+        nonlocal songs, list_name
+        if list_name == playlist_name and len(new_songs) == len(songs) and all(a["file_path"] == b["file_path"] for a, b in zip(songs, new_songs)):
+            # same rows in the same order: patch the ones whose data changed
+            for list_index, (old, new) in enumerate(zip(songs, new_songs)):
+                if old != new:
+                    old.update(new)
+                    if window[0] <= list_index < window[1]:
+                        bind_row(songs_list_control.controls[list_index - window[0]], list_index)
+            update_ui()
+            return
+        if player.name == playlist_name:
+            player.set_songs(new_songs, playlist_name)
+        songs, list_name = new_songs, playlist_name
+        track_count.value = f"{len(songs)} tracks"
+        render_window()
         if isinstance(songs_list_control, ft.ReorderableListView):
             songs_list_control.disabled = is_favourites_playlist
         update_ui()
 
+    def start_radio(seed, radio):
+        # the radio queue replaces the song list until the playlist is loaded again
+        nonlocal songs, list_name
+        list_name = f"{RADIO_PREFIX}{seed['title']}"
+        playlist_title.value = list_name
+        songs = radio
+        player.set_songs(radio, list_name)
+        track_count.value = f"{len(songs)} tracks"
+        render_window(0)
+        songs_list_control.scroll_to(offset=0)
+        if isinstance(songs_list_control, ft.ReorderableListView):
+            songs_list_control.disabled = True
+        player.play_index(0)
+
     def on_reorder(e: ft.OnReorderEvent):
-        old, new = e.old_index, e.new_index
-        ctrl = songs_list_control.controls.pop(old)
-        songs_list_control.controls.insert(new, ctrl)
-        song = player.songs.pop(old)
-        player.songs.insert(new, song)
+        # indices are relative to the rendered window
+        old, new = window[0] + e.old_index, min(window[0] + e.new_index, len(songs) - 1)
+        if owns_player():
+            player.move_song(old, new)
+        else:
+            songs.insert(new, songs.pop(old))
 
-        songs_list_control.controls[:] = [song_tile(s, i) for i, s in enumerate(player.songs)]
+        # only the rows between the two positions changed
+        start = window[0]
+        for list_index in range(max(min(old, new), start), min(max(old, new) + 1, window[1])):
+            bind_row(songs_list_control.controls[list_index - start], list_index)
         
-        EXECUTOR.submit(DbService.update_playlist_order, playlist_name, [c.key for c in songs_list_control.controls])
-        if player.current_index == old:
-            player.current_index = new
-        elif old < player.current_index <= new:
-            player.current_index -= 1
-        elif new <= player.current_index < old:
-            player.current_index += 1
+        def after_reorder(future: Future):
+            try:
+                saved(future, (events.TRACK_REORDERED, None))
+            except Exception as e:
+                print(f"Error saving the new order: {e}")
+                page.run_thread(refresh_songs)
+
+        own_edits.add((events.TRACK_REORDERED, None))
+        EXECUTOR.submit(DbService.update_playlist_order, playlist_name, [s["file_path"] for s in songs]).add_done_callback(after_reorder)
         update_ui()
 
-    songs_list_control = ft.ListView(expand=True, auto_scroll=False, padding=0) if is_favourites_playlist else ft.ReorderableListView(expand=True, auto_scroll=False, on_reorder=on_reorder)
+    def on_data_event(event):
+        nonlocal refresh_pending
+        key = (event.kind, event.file_path)
+        if key in own_edits:
+            own_edits.discard(key)
+            return
+        if event.kind == events.TRACK_RENAMED:
+            # matched by path: rows in Favourites or a radio belong to other playlists
+            song = next((s for s in songs if s["file_path"] == event.file_path), None)
+            if song is not None:
+                reload_song(song)
+            return
+        if event.playlist is not None and event.playlist != playlist_name and not (is_favourites_playlist and event.kind == events.FAVOURITE_TOGGLED):
+            return
+        if list_name.startswith(RADIO_PREFIX):
+            # a radio is not tied to the playlist, reloading would replace it
+            return
+        # anything else goes through the diffing refresh; a burst of events loads the playlist once
+        if not refresh_pending:
+            refresh_pending = True
+            page.run_thread(refresh_songs)
+    events.subscribe("player_view", on_data_event)
+
+    songs_list_control = ft.ListView(expand=True, auto_scroll=False, padding=0, on_scroll=on_scroll, on_scroll_interval=50) if is_favourites_playlist else ft.ReorderableListView(expand=True, auto_scroll=False, on_reorder=on_reorder, on_scroll=on_scroll, on_scroll_interval=50)
 
     PlayerButtons = getButtons(player)
 
@@ -286,7 +556,8 @@ def get_player_view(page: ft.Page, playlist_name: str, open_main_list_view_fn):
         content=ft.Column([
             ft.Row([
                 ft.IconButton(icon=ft.Icons.ARROW_BACK, icon_color=ft.Colors.WHITE, icon_size=18, on_click=lambda _: go_back()),
-                ft.Column([playlist_title, track_count], tight=True)
+                ft.Column([playlist_title, track_count], tight=True, expand=True),
+                ft.IconButton(icon=ft.Icons.QUEUE_MUSIC, icon_color=ft.Colors.WHITE, icon_size=18, tooltip="Up next", on_click=lambda _: queue_dialog(page, player))
             ], spacing=12),
             ft.Row([
                 ft.Text("#", size=14, weight=ft.FontWeight.BOLD, color=ft.Colors.GREY, width=100),
@@ -310,7 +581,7 @@ def get_player_view(page: ft.Page, playlist_name: str, open_main_list_view_fn):
             ),
             ft.Column([
                 ft.Row(PlayerButtons, alignment=ft.MainAxisAlignment.CENTER, spacing=16),
-                ft.Row([position_text, progress_slider, duration_text], alignment=ft.MainAxisAlignment.CENTER, spacing=8, width=500)
+                ft.Row([position_text, seek_bar, duration_text], alignment=ft.MainAxisAlignment.CENTER, spacing=8, width=500)
             ], expand=True, alignment=ft.MainAxisAlignment.CENTER, horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=6),
             ft.Container(
                 content=ft.Row([
@@ -325,6 +596,6 @@ def get_player_view(page: ft.Page, playlist_name: str, open_main_list_view_fn):
         border=ft.border.only(top=ft.border.BorderSide(1, ft.Colors.BLACK)),
         bgcolor=ft.Colors.with_opacity(0.98, ft.Colors.BLACK)
     )
-    page.add(audio)
-    songs_list_control.controls[:] = [song_tile(s, i) for i, s in enumerate(player.songs)]
+    show_waveform(now_playing)
+    render_window()
     return [header, songs_list_control, player_controls]